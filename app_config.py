@@ -0,0 +1,147 @@
+import configparser
+import copy
+import json
+import os
+import threading
+from dotenv import dotenv_values, find_dotenv
+
+# Files the configuration is read from; a change to any of their mtimes triggers a reload
+PREFERENCES_FILE = 'model_preferences.json'
+PRAW_INI_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'praw.ini')
+ENV_FILE = find_dotenv() or os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _read_model_preferences():
+    if os.path.exists(PREFERENCES_FILE):
+        try:
+            with open(PREFERENCES_FILE, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"Warning: Could not decode JSON from {PREFERENCES_FILE}. Returning empty preferences.")
+            return {}
+    return {}
+
+def _read_api_keys():
+    # Process environment variables take precedence over .env, as with load_dotenv()
+    env_file_values = dotenv_values(ENV_FILE) if os.path.exists(ENV_FILE) else {}
+    def getenv(name):
+        return os.getenv(name) or env_file_values.get(name)
+
+    api_keys = {}
+
+    # Try to load API keys from environment variables first
+    api_keys['openai_api_key'] = getenv('OPENAI_API_KEY')
+    api_keys['google_gemini_api_key'] = getenv('GOOGLE_GEMINI_API_KEY')
+
+    # Load Reddit credentials from environment variables
+    reddit_client_id = getenv('REDDIT_CLIENT_ID')
+    reddit_client_secret = getenv('REDDIT_CLIENT_SECRET')
+    reddit_user_agent = getenv('REDDIT_USER_AGENT')
+    reddit_username = getenv('REDDIT_USERNAME')
+    reddit_password = getenv('REDDIT_PASSWORD')
+
+    # If not found in environment variables, try to load from praw.ini
+    config = configparser.ConfigParser()
+    config.read(PRAW_INI_FILE)
+
+    if 'api_keys' in config:
+        if not api_keys['openai_api_key']:
+            api_keys['openai_api_key'] = config.get('api_keys', 'openai_api_key', fallback=None)
+        if not api_keys['google_gemini_api_key']:
+            api_keys['google_gemini_api_key'] = config.get('api_keys', 'google_gemini_api_key', fallback=None)
+
+    # Load Reddit credentials from praw.ini if not found in environment variables
+    reddit_creds = {}
+    if 'default' in config:
+        if not reddit_client_id:
+            reddit_creds['client_id'] = config.get('default', 'client_id', fallback=None)
+        if not reddit_client_secret:
+            reddit_creds['client_secret'] = config.get('default', 'client_secret', fallback=None)
+        if not reddit_user_agent:
+            reddit_creds['user_agent'] = config.get('default', 'user_agent', fallback=None)
+        if not reddit_username:
+            reddit_creds['username'] = config.get('default', 'username', fallback=None)
+        if not reddit_password:
+            reddit_creds['password'] = config.get('default', 'password', fallback=None)
+
+    # Combine environment variables and praw.ini for Reddit credentials
+    api_keys['reddit_creds'] = {
+        'client_id': reddit_client_id or reddit_creds.get('client_id'),
+        'client_secret': reddit_client_secret or reddit_creds.get('client_secret'),
+        'user_agent': reddit_user_agent or reddit_creds.get('user_agent'),
+        'username': reddit_username or reddit_creds.get('username'),
+        'password': reddit_password or reddit_creds.get('password')
+    }
+
+    return api_keys
+
+class AppConfig:
+    """API keys and model preferences, loaded once and shared by the GUI and the backend.
+
+    Each access costs a few stat() calls: the cached values are reloaded only when the mtime
+    of praw.ini, .env or the preferences file changes. Callers get copies they may modify.
+    Process environment variables are read at load time and not watched.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._api_keys = None
+        self._api_keys_mtimes = None
+        self._preferences = None
+        self._preferences_mtime = None
+
+    def api_keys(self):
+        mtimes = (_mtime(PRAW_INI_FILE), _mtime(ENV_FILE))
+        with self._lock:
+            if self._api_keys is None or mtimes != self._api_keys_mtimes:
+                self._api_keys = _read_api_keys()
+                self._api_keys_mtimes = mtimes
+            return copy.deepcopy(self._api_keys)
+
+    def model_preferences(self):
+        mtime = _mtime(PREFERENCES_FILE)
+        with self._lock:
+            if self._preferences is None or mtime != self._preferences_mtime:
+                self._preferences = _read_model_preferences()
+                self._preferences_mtime = mtime
+            return copy.deepcopy(self._preferences)
+
+    def save_model_preferences(self, preferences):
+        with self._lock:
+            try:
+                with open(PREFERENCES_FILE, 'w') as f:
+                    json.dump(preferences, f, indent=4)
+            except IOError as e:
+                print(f"Error saving preferences to {PREFERENCES_FILE}: {e}")
+                return
+            self._preferences = copy.deepcopy(preferences)
+            self._preferences_mtime = _mtime(PREFERENCES_FILE)
+
+    def invalidate(self):
+        """Forces a reload on next access, e.g. after changing environment variables."""
+        with self._lock:
+            self._api_keys = None
+            self._preferences = None
+
+# The shared configuration of this process
+app_config = AppConfig()
+
+def load_model_preferences():
+    """Loads model preferences from a JSON file."""
+    return app_config.model_preferences()
+
+def save_model_preferences(preferences):
+    """Saves model preferences to a JSON file."""
+    app_config.save_model_preferences(preferences)
+
+def load_api_keys():
+    """Returns the OpenAI and Gemini API keys and the Reddit credentials.
+
+    Environment variables (and .env) take precedence over praw.ini.
+    """
+    return app_config.api_keys()
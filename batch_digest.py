@@ -0,0 +1,137 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from reddit_digest import get_reddit_digest, is_error_digest
+from digest_history import add_digest_to_history
+from rate_limiter import get_rate_limit_stats
+
+# Upper bound on threads digested at the same time
+DEFAULT_MAX_WORKERS = 8
+
+def read_url_file(path):
+    """Reads one URL per line from a file, ignoring blank lines and '#' comments."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+def _digest_one(url, summarization_method, model_name, detail_level, enable_text_analysis, force_refresh, expand_comments, incremental):
+    """Runs a single digest and wraps the outcome in a per-URL result dict."""
+    started = time.perf_counter()
+    report = {}
+    try:
+        digest_content, model_used, title = get_reddit_digest(url, summarization_method, model_name, detail_level, enable_text_analysis, report=report,
+                                                                force_refresh=force_refresh, expand_comments=expand_comments, incremental=incremental)
+    except Exception as e:
+        print(f"Error digesting {url}: {e}")
+        # Same wording as the pipeline's own message, so is_error_digest recognises it
+        digest_content, model_used, title = f"An unexpected error occurred while fetching Reddit content or summarizing. ({e})", None, None
+
+    return {
+        "url": url,
+        "status": "error" if is_error_digest(digest_content) else "ok",
+        "digest": digest_content,
+        "model": model_used,
+        "title": title,
+        "seconds": time.perf_counter() - started,
+        "report": report
+    }
+
+def iter_reddit_digests(urls, summarization_method="top5", model_name=None, detail_level=None, enable_text_analysis=False,
+                        max_workers=DEFAULT_MAX_WORKERS, force_refresh=False, expand_comments=None, incremental=None):
+    """Digests several threads on a bounded worker pool, yielding each result as soon as it finishes.
+
+    Fetching and summarization for different threads overlap, so the total wall-clock
+    time is close to the slowest thread rather than the sum of all of them.
+    """
+    unique_urls = list(dict.fromkeys(urls)) # Drop duplicates, keep order
+    if not unique_urls:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_urls)))) as executor:
+        futures = [
+            executor.submit(_digest_one, url, summarization_method, model_name, detail_level, enable_text_analysis, force_refresh, expand_comments,
+                            incremental)
+            for url in unique_urls
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+def run_batch_digest(urls, summarization_method="top5", model_name=None, detail_level=None, enable_text_analysis=False,
+                     max_workers=DEFAULT_MAX_WORKERS, save_to_history=False, on_result=None, force_refresh=False,
+                     expand_comments=None, incremental=None):
+    """Digests all URLs and returns a dict mapping each URL to its result.
+
+    `on_result` is called with every result as it arrives. Successful digests are
+    written to history from the calling thread when `save_to_history` is set; threads
+    an incremental digest found unchanged are not written again.
+    """
+    results = {}
+    for result in iter_reddit_digests(urls, summarization_method, model_name, detail_level, enable_text_analysis, max_workers,
+                                      force_refresh, expand_comments, incremental):
+        unchanged = result["report"].get("incremental", {}).get("mode") == "unchanged"
+        if save_to_history and result["status"] == "ok" and not unchanged:
+            add_digest_to_history(result["url"], summarization_method, result["model"], detail_level,
+                                  result["digest"], result["title"], enable_text_analysis,
+                                  result["report"].get("submission_id"), result["report"].get("comment_fingerprints"))
+        if on_result:
+            on_result(result)
+        results[result["url"]] = result
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Digest several Reddit threads concurrently.")
+    parser.add_argument("urls", nargs="*", help="Reddit thread URLs")
+    parser.add_argument("-f", "--file", help="File with one Reddit thread URL per line")
+    parser.add_argument("-m", "--method", default="top5", choices=["top5", "openai", "gemini", "extractive", "race"], help="Summarization method")
+    parser.add_argument("--model", help="Model name (defaults to the model preferences)")
+    parser.add_argument("-d", "--detail-level", default="standard", choices=["concise", "standard", "detailed"], help="Detail level for AI summaries")
+    parser.add_argument("--text-analysis", action="store_true", help="Enable keywords and sentiment analysis")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Maximum number of threads digested at once")
+    parser.add_argument("--force-refresh", action="store_true", help="Re-download threads even if a fresh cached copy exists")
+    parser.add_argument("--expand-comments", action="store_true", default=None, help="Expand collapsed replies within the configured budgets")
+    parser.add_argument("--save-history", action="store_true", help="Add successful digests to the history")
+    parser.add_argument("--incremental", action="store_true", default=None,
+                        help="Send only comments that changed since the last saved AI digest of each thread (use with --save-history)")
+    parser.add_argument("-o", "--output", help="Write all results to this JSON file")
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.file:
+        urls.extend(read_url_file(args.file))
+    if not urls:
+        parser.error("no URLs given")
+    if args.method == "race" and args.model:
+        parser.error("--model cannot be used with the race method, which takes its models from the \"race\" preferences")
+
+    detail_level = args.detail_level if args.method != "top5" else None
+
+    def print_result(result):
+        prompt_cache = result["report"].get("prompt_cache")
+        cached = f", {prompt_cache['cached_tokens']}/{prompt_cache['prompt_tokens']} prompt tokens cached" if prompt_cache else ""
+        delta = result["report"].get("incremental")
+        changes = f", {delta['mode']}: {delta['new']} new, {delta['edited']} edited" if delta else ""
+        print(f"[{result['status']}] {result['url']} ({result['seconds']:.1f}s{cached}{changes})", file=sys.stderr)
+        if not args.output:
+            print(result["digest"])
+            print()
+
+    started = time.perf_counter()
+    results = run_batch_digest(urls, args.method, args.model, detail_level, args.text_analysis,
+                               args.workers, args.save_history, print_result, args.force_refresh,
+                               args.expand_comments, args.incremental)
+    failed = sum(1 for result in results.values() if result["status"] != "ok")
+    print(f"Digested {len(results) - failed}/{len(results)} threads in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    for provider, stats in get_rate_limit_stats().items():
+        if stats["requests"]:
+            print(f"  {provider}: {stats['requests']} requests, {stats['throttled']} throttled for {stats['throttle_seconds']:.1f}s "
+                  f"(max queue {stats['max_queue_depth']}), {stats['retries']} retries, {stats['rate_limited']} rate limited", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
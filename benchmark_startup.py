@@ -0,0 +1,107 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Child process for the first-paint measurement: prints the wall-clock time of the window's first paint
+FIRST_PAINT_SCRIPT = """
+import sys, time
+from PyQt6.QtCore import QObject, QEvent, QTimer
+from PyQt6.QtWidgets import QApplication
+from main import RedditDigestApp
+
+class FirstPaintFilter(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            print(f"FIRST_PAINT {time.time()}", flush=True)
+            QTimer.singleShot(0, QApplication.instance().quit)
+            obj.removeEventFilter(self)
+        return False
+
+app = QApplication(sys.argv)
+window = RedditDigestApp()
+paint_filter = FirstPaintFilter()
+window.installEventFilter(paint_filter)
+window.show()
+app.exec()
+"""
+
+# Modules whose import cost is reported separately; provider SDKs are listed to show what lazy loading saves
+DEFAULT_MODULES = ["reddit_digest", "main", "openai", "google.generativeai", "praw", "numpy", "tiktoken"]
+
+def _child_env(offscreen):
+    env = dict(os.environ)
+    if offscreen:
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+def measure_first_paint(runs, offscreen=True):
+    """Returns the seconds from process launch to the first paint of the main window, one value per run."""
+    timings = []
+    for _ in range(runs):
+        launched = time.time()
+        result = subprocess.run([sys.executable, "-c", FIRST_PAINT_SCRIPT], capture_output=True, text=True, env=_child_env(offscreen), timeout=120)
+        marker = next((line for line in result.stdout.splitlines() if line.startswith("FIRST_PAINT ")), None)
+        if marker is None:
+            print(f"Error: the window was not painted (exit code {result.returncode}).\n{result.stderr.strip()}")
+            return []
+        timings.append(float(marker.split()[1]) - launched)
+    return timings
+
+def measure_import(module_name, runs):
+    """Returns the seconds needed to import a module in a fresh interpreter, one value per run, or None if it is missing."""
+    timings = []
+    code = f"import time; started = time.perf_counter(); import {module_name}; print(time.perf_counter() - started)"
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+        if result.returncode != 0:
+            return None
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+def import_breakdown(module_name, top=15):
+    """Returns the `top` most expensive (cumulative seconds, module) pairs when importing a module, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module_name}"], capture_output=True, text=True, timeout=120)
+    entries = []
+    for line in result.stderr.splitlines():
+        # Format: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            entries.append((int(cumulative) / 1e6, name.strip()))
+        except ValueError:
+            continue
+    return sorted(entries, reverse=True)[:top]
+
+def _describe(timings):
+    return f"median {statistics.median(timings) * 1000:8.1f} ms  (min {min(timings) * 1000:.1f}, max {max(timings) * 1000:.1f}, n={len(timings)})"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Reddigest startup time: launch to first paint and the cost of each import.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement (default: 5).")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list for reddit_digest (default: 15).")
+    parser.add_argument("--modules", nargs="*", default=DEFAULT_MODULES, help="Modules whose import time is measured.")
+    parser.add_argument("--no-paint", action="store_true", help="Skip the first-paint measurement (no Qt needed).")
+    parser.add_argument("--on-screen", action="store_true", help="Show the window on the real display instead of Qt's offscreen platform.")
+    args = parser.parse_args(argv)
+
+    if not args.no_paint:
+        timings = measure_first_paint(args.runs, offscreen=not args.on_screen)
+        if timings:
+            print(f"Launch to first paint:      {_describe(timings)}")
+
+    print("\nImport time in a fresh interpreter:")
+    for module_name in args.modules:
+        timings = measure_import(module_name, args.runs)
+        print(f"  {module_name:<24}{_describe(timings) if timings else 'not installed or failed to import'}")
+
+    print("\nSlowest imports under reddit_digest (cumulative):")
+    for seconds, name in import_breakdown("reddit_digest", args.top):
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# Token estimation and comment batching for map-reduce summarization of large threads
+
+CHARS_PER_TOKEN = 4 # Rough average for English text when tiktoken is not available
+
+# Per-provider defaults; override them per provider or per model under "chunking" in model_preferences.json, e.g.
+# "chunking": {"openai": {"parallelism": 2}, "gpt-4o": {"single_pass_tokens": 60000}}
+CHUNKING_DEFAULTS = {
+    "openai": {
+        "single_pass_tokens": 12000, # Threads up to this size are summarized in one prompt
+        "chunk_tokens": 6000, # Size of each map batch
+        "parallelism": 4, # Map batches summarized at the same time
+        "max_input_tokens": 200000 # Comments beyond this budget are dropped
+    },
+    "gemini": {
+        "single_pass_tokens": 200000,
+        "chunk_tokens": 100000,
+        "parallelism": 4,
+        "max_input_tokens": 1000000
+    }
+}
+
+_encoding = None
+_tiktoken_missing = False
+
+def _get_encoding():
+    """Loads the tiktoken encoding for exact OpenAI token counts on first use; None without tiktoken."""
+    global _encoding, _tiktoken_missing
+    if _encoding is None and not _tiktoken_missing:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _tiktoken_missing = True
+        except Exception as e: # The encoding is downloaded on first use, which fails offline or behind a proxy
+            _tiktoken_missing = True
+            print(f"Warning: Could not load the tiktoken encoding ({e}). Estimating token counts from text length instead.")
+    return _encoding
+
+def estimate_tokens(text):
+    """Returns the number of tokens in text, exact with tiktoken and estimated otherwise."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def get_chunking_config(provider, model_name=None, preferences=None):
+    """Merges the provider defaults with provider and model overrides from the preferences."""
+    config = dict(CHUNKING_DEFAULTS.get(provider, CHUNKING_DEFAULTS["openai"]))
+    overrides = (preferences or {}).get("chunking", {})
+    config.update(overrides.get(provider, {}))
+    if model_name:
+        config.update(overrides.get(model_name, {}))
+    return config
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts text so that it fits in max_tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+def apply_token_budget(comments, max_tokens, priorities=None):
+    """Keeps comments until the token budget is spent.
+
+    Without priorities, comments are kept in the given order. With priorities (one per
+    comment, higher first), the best-ranked comments are kept, still in the given order.
+    """
+    order = range(len(comments))
+    if priorities is not None:
+        order = sorted(order, key=lambda index: priorities[index], reverse=True)
+    kept_indexes = []
+    used = 0
+    for index in order:
+        tokens = estimate_tokens(comments[index])
+        if used + tokens > max_tokens:
+            if priorities is None:
+                break
+            continue # A shorter, lower-ranked comment may still fit
+        kept_indexes.append(index)
+        used += tokens
+    return [comments[index] for index in sorted(kept_indexes)]
+
+def chunk_comments(comments, chunk_tokens):
+    """Packs comments greedily into batches of at most chunk_tokens; oversized comments are truncated."""
+    batches = []
+    current = []
+    current_tokens = 0
+    for comment in comments:
+        tokens = estimate_tokens(comment)
+        if tokens > chunk_tokens:
+            comment = truncate_to_tokens(comment, chunk_tokens)
+            tokens = chunk_tokens
+        if current and current_tokens + tokens > chunk_tokens:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(comment)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,147 @@
+import asyncio
+import time
+import praw
+from rate_limiter import run_with_rate_limit, run_with_rate_limit_async
+
+# Limits for expanding collapsed "MoreComments" stubs; override them under "comment_expansion" in model_preferences.json
+COMMENT_EXPANSION_DEFAULTS = {
+    "enabled": False, # When disabled, only top-level comments are kept (no extra requests)
+    "max_more_requests": 32, # MoreComments requests per thread
+    "max_depth": 4, # Deepest reply level kept (0 = top-level comments)
+    "reply_budget": 2000, # Total comments kept
+    "time_budget_seconds": 20.0, # Wall-clock time spent on expansion
+    "parallelism": 4 # MoreComments requests in flight at once (async fetches only)
+}
+
+def get_expansion_config(preferences=None, enabled=None):
+    """Merges the defaults with preference overrides; `enabled` forces expansion on or off."""
+    config = dict(COMMENT_EXPANSION_DEFAULTS)
+    config.update((preferences or {}).get("comment_expansion", {}))
+    if enabled is not None:
+        config["enabled"] = enabled
+    return config
+
+def _comment_to_dict(comment, depth):
+    data = vars(comment) # Read the API fields directly, never trigger a lazy fetch
+    return {
+        'id': comment.id,
+        'parent_id': comment.parent_id,
+        'depth': depth,
+        'body': comment.body,
+        'score': data.get('score', 0),
+        'awards': data.get('total_awards_received', 0),
+        'created_utc': data.get('created_utc', 0),
+        'controversiality': data.get('controversiality', 0)
+    }
+
+def _collect_comments(nodes, default_depth, submission, comments, pending_more, config, comment_type, more_type):
+    """Walks fetched nodes depth-first, keeping comments and queueing MoreComments stubs for later rounds."""
+    stack = [(node, default_depth) for node in reversed(list(nodes))]
+    while stack and len(comments) < config["reply_budget"]:
+        node, depth = stack.pop()
+        depth = vars(node).get('depth', depth)
+        if depth > config["max_depth"]:
+            continue
+        if isinstance(node, more_type):
+            node.submission = submission # Needed to fetch stubs returned by earlier requests
+            pending_more.append((depth, node))
+        elif isinstance(node, comment_type):
+            comments.append(_comment_to_dict(node, depth))
+            stack.extend((reply, depth + 1) for reply in reversed(list(node.replies)))
+
+def _next_round(pending_more, config, requests_made):
+    """Takes the next batch of stubs to fetch: shallow, large stubs first, as they hold the most visible part of the discussion."""
+    pending_more.sort(key=lambda item: (item[0], -item[1].count))
+    round_size = min(config["parallelism"], config["max_more_requests"] - requests_made)
+    batch, pending_more[:] = pending_more[:round_size], pending_more[round_size:]
+    return batch
+
+def _within_budget(pending_more, config, requests_made, comments, started):
+    return (pending_more and requests_made < config["max_more_requests"] and len(comments) < config["reply_budget"]
+            and time.monotonic() - started < config["time_budget_seconds"])
+
+def flatten_comment_forest(submission, config):
+    """Returns the thread's comments as a flat list of dicts with their parent id and depth.
+
+    Collapsed subtrees are expanded breadth-first, shallowest first, within the request,
+    depth, reply and time budgets of `config`. MoreComments stubs are fetched one at a time:
+    the PRAW client is not thread-safe and is checked out by this thread alone.
+    """
+    started = time.monotonic()
+    if not config.get("enabled"):
+        submission.comments.replace_more(limit=0) # Flatten comments, remove "More Comments"
+        return [_comment_to_dict(comment, 0) for comment in submission.comments if isinstance(comment, praw.models.Comment)]
+
+    comments = []
+    pending_more = [] # (depth, MoreComments)
+    _collect_comments(submission.comments, 0, submission, comments, pending_more, config, praw.models.Comment, praw.models.MoreComments)
+
+    requests_made = 0
+    while _within_budget(pending_more, config, requests_made, comments, started):
+        batch = _next_round(pending_more, config, requests_made)
+        requests_made += len(batch)
+        for depth, more in batch:
+            fetched = run_with_rate_limit("reddit", lambda: more.comments(update=False))
+            _collect_comments(fetched, depth, submission, comments, pending_more, config, praw.models.Comment, praw.models.MoreComments)
+
+    return order_as_tree(comments[:config["reply_budget"]])
+
+async def flatten_comment_forest_async(submission, config):
+    """Async PRAW counterpart of flatten_comment_forest, with the same budgets.
+
+    Each round of MoreComments requests is awaited together on the event loop.
+    """
+    import asyncpraw # Only needed by the async pipeline, which checks that it is installed
+
+    started = time.monotonic()
+    if not config.get("enabled"):
+        await submission.comments.replace_more(limit=0)
+        return [_comment_to_dict(comment, 0) for comment in list(submission.comments) if isinstance(comment, asyncpraw.models.Comment)]
+
+    comments = []
+    pending_more = []
+    _collect_comments(submission.comments, 0, submission, comments, pending_more, config, asyncpraw.models.Comment, asyncpraw.models.MoreComments)
+
+    requests_made = 0
+    while _within_budget(pending_more, config, requests_made, comments, started):
+        batch = _next_round(pending_more, config, requests_made)
+        requests_made += len(batch)
+        fetched_batches = await asyncio.gather(*(run_with_rate_limit_async("reddit", lambda more=more: more.comments(update=False)) for _, more in batch))
+        for (depth, _), fetched in zip(batch, fetched_batches):
+            _collect_comments(fetched, depth, submission, comments, pending_more, config, asyncpraw.models.Comment, asyncpraw.models.MoreComments)
+
+    return order_as_tree(comments[:config["reply_budget"]])
+
+def order_as_tree(comments):
+    """Orders flattened comments depth-first, so every reply directly follows its parent."""
+    comment_ids = {f"t1_{comment['id']}" for comment in comments}
+    children = {}
+    roots = []
+    for comment in comments:
+        if comment['parent_id'] in comment_ids:
+            children.setdefault(comment['parent_id'], []).append(comment)
+        else:
+            roots.append(comment)
+
+    ordered = []
+    stack = list(reversed(roots))
+    while stack:
+        comment = stack.pop()
+        ordered.append(comment)
+        stack.extend(reversed(children.get(f"t1_{comment['id']}", [])))
+    return ordered
+
+def format_comment_for_prompt(comment):
+    """Indents replies under their parent so models can follow the conversation."""
+    body = comment['body']
+    if comment.get('duplicates'): # Near-duplicates folded into this comment, see dedup.py
+        body = f"({comment['duplicates'] + 1} similar comments) {body}"
+    if comment.get('reply_to'): # Changed reply sent without its parent, see incremental.py
+        body = f"(reply to: \"{comment['reply_to']}\") {body}"
+    if comment.get('change') == "edited":
+        body = f"(edited) {body}"
+    depth = comment.get('depth', 0)
+    if not depth:
+        return body
+    indent = "    " * depth
+    return indent + "> " + body.replace("\n", "\n" + indent + "  ")
@@ -0,0 +1,53 @@
+import heapq
+import math
+import time
+
+# Ranking strategies for choosing which comments to show or send to a model
+RANKING_STRATEGIES = ("score", "hot", "controversial", "balanced")
+
+# Override these under "comment_ranking" in model_preferences.json
+COMMENT_RANKING_DEFAULTS = {
+    "top_k": 5, # Comments listed by the Top 5 method
+    "strategy": "score"
+}
+
+def get_ranking_config(preferences=None, top_k=None, strategy=None):
+    """Merges the defaults with preference overrides and explicit arguments."""
+    config = dict(COMMENT_RANKING_DEFAULTS)
+    config.update((preferences or {}).get("comment_ranking", {}))
+    if top_k is not None:
+        config["top_k"] = top_k
+    if strategy is not None:
+        config["strategy"] = strategy
+    if config["strategy"] not in RANKING_STRATEGIES:
+        print(f"Warning: Unknown ranking strategy '{config['strategy']}'. Using 'score'.")
+        config["strategy"] = "score"
+    return config
+
+def comment_rank(comment, strategy="score", now=None):
+    """Returns the ranking key of a comment dict; higher ranks first."""
+    score = comment.get('score', 0)
+    if strategy == "score":
+        return score
+
+    awards = comment.get('awards', 0)
+    depth = comment.get('depth', 0)
+    if strategy == "hot":
+        # Score decays with age, like Hacker News' gravity formula
+        age_hours = max(0.0, ((now or time.time()) - comment.get('created_utc', 0)) / 3600)
+        return (score + 2 * awards) / math.pow(age_hours + 2, 1.5)
+    if strategy == "controversial":
+        # Reddit's controversiality flag first, then the amount of engagement
+        return comment.get('controversiality', 0) * 1_000_000 + math.log1p(abs(score)) + awards
+    # "balanced": score and awards, with nested replies counting less than top-level answers
+    return (score + 10 * awards) / (1 + depth)
+
+def top_k_comments(comments, k=5, strategy="score", now=None):
+    """Selects the k best comments in a single heap-based pass, best first."""
+    now = now or time.time()
+    return heapq.nlargest(k, comments, key=lambda comment: comment_rank(comment, strategy, now))
+
+def comment_priorities(comments, strategy="score", now=None):
+    """Returns the rank of every comment, in the same order, to decide what to keep under a token budget."""
+    now = now or time.time()
+    return [comment_rank(comment, strategy, now) for comment in comments]
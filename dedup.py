@@ -0,0 +1,133 @@
+# Near-duplicate comment folding with MinHash signatures and LSH banding
+import random
+import re
+import zlib
+
+# NumPy speeds up signature computation; imported on first use via extractive, which warns when it is missing
+from numpy_support import load_numpy
+
+# Override these under "deduplication" in model_preferences.json
+DEDUP_DEFAULTS = {
+    "enabled": True, # Fold "+1", "this" and copy-pasted comments before building the prompt
+    "threshold": 0.8, # Estimated Jaccard similarity above which two comments count as duplicates
+    "num_perm": 64, # MinHash signature length
+    "bands": 16 # LSH bands; num_perm / bands rows each
+}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r"\w+")
+_SHINGLE_SIZE = 3 # Words per shingle for comments long enough to have one
+
+def get_dedup_config(preferences=None, enabled=None):
+    """Merges the defaults with preference overrides; `enabled` forces the stage on or off."""
+    config = dict(DEDUP_DEFAULTS)
+    config.update((preferences or {}).get("deduplication", {}))
+    if enabled is not None:
+        config["enabled"] = enabled
+    if config["num_perm"] % config["bands"]:
+        print(f"Warning: num_perm ({config['num_perm']}) is not a multiple of bands ({config['bands']}). Using the defaults.")
+        config["num_perm"], config["bands"] = DEDUP_DEFAULTS["num_perm"], DEDUP_DEFAULTS["bands"]
+    return config
+
+def shingle_hashes(text):
+    """Hashes the word 3-grams of a comment; short comments use their words, empty ones the raw text."""
+    words = _WORD.findall(text.lower())
+    if len(words) >= _SHINGLE_SIZE:
+        shingles = {" ".join(words[i:i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)}
+    else:
+        shingles = {" ".join(words) or text.strip()}
+    # crc32 rather than hash() so signatures, and therefore prompts and cache keys, are stable across runs
+    return [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+
+def _permutations(num_perm):
+    """Fixed (a, b) pairs for the universal hash family (a * x + b) mod p."""
+    generator = random.Random(1) # Seeded so signatures are reproducible
+    return [(generator.randint(1, _MAX_HASH), generator.randint(0, _MAX_HASH)) for _ in range(num_perm)]
+
+def minhash_signatures(texts, num_perm=64):
+    """Computes one MinHash signature (a tuple of num_perm ints) per text."""
+    parameters = _permutations(num_perm)
+    signatures = []
+    np = load_numpy()
+    if np is not None:
+        # a, b and the shingle hashes are all 32-bit, so a * x + b fits in uint64 without wrapping
+        a = np.array([a for a, _ in parameters], dtype=np.uint64)[:, None]
+        b = np.array([b for _, b in parameters], dtype=np.uint64)[:, None]
+        prime = np.uint64(_MERSENNE_PRIME)
+        for text in texts:
+            hashes = np.array(shingle_hashes(text), dtype=np.uint64)[None, :]
+            signatures.append(tuple(((a * hashes + b) % prime).min(axis=1).tolist()))
+        return signatures
+    for text in texts:
+        hashes = shingle_hashes(text)
+        signatures.append(tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in parameters))
+    return signatures
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def cluster_near_duplicates(texts, threshold=0.8, num_perm=64, bands=16):
+    """Returns a cluster id per text; near-duplicate texts share the id.
+
+    Each text is compared only with the first text seen in each of its LSH buckets,
+    so the work grows linearly with the number of texts rather than quadratically.
+    """
+    signatures = minhash_signatures(texts, num_perm)
+    rows = num_perm // bands
+    parent = list(range(len(texts)))
+    buckets = {}
+    for i, signature in enumerate(signatures):
+        for band in range(bands):
+            j = buckets.setdefault((band, signature[band * rows:(band + 1) * rows]), i)
+            if j == i:
+                continue
+            root_i, root_j = _find(parent, i), _find(parent, j)
+            if root_i == root_j:
+                continue
+            # Fraction of matching MinHash values estimates the Jaccard similarity of the shingle sets
+            similarity = sum(x == y for x, y in zip(signature, signatures[j])) / num_perm
+            if similarity >= threshold:
+                parent[root_i] = root_j
+    return [_find(parent, i) for i in range(len(texts))]
+
+def fold_near_duplicates(comments, config=None):
+    """Collapses near-duplicate comment dicts into one representative each.
+
+    The representative is the highest scoring comment of its group and gets a 'duplicates'
+    count of the comments folded into it. Comments with replies are never folded away, so
+    the reply tree stays intact. Returns (comments, stats) with the original order kept.
+    """
+    config = config or get_dedup_config()
+    stats = {"comments_in": len(comments), "comments_out": len(comments), "folded": 0}
+    if len(comments) < 2:
+        return list(comments), stats
+
+    cluster_ids = cluster_near_duplicates([comment['body'] for comment in comments], config['threshold'], config['num_perm'], config['bands'])
+    groups = {}
+    for index, cluster_id in enumerate(cluster_ids):
+        groups.setdefault(cluster_id, []).append(index)
+
+    parents = {comment.get('parent_id') for comment in comments}
+    duplicates = {}
+    dropped = set()
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        representative = max(members, key=lambda index: (comments[index].get('score', 0), -index))
+        folded = [index for index in members if index != representative and f"t1_{comments[index].get('id')}" not in parents]
+        if folded:
+            duplicates[representative] = sum(1 + comments[index].get('duplicates', 0) for index in folded)
+            dropped.update(folded)
+
+    result = []
+    for index, comment in enumerate(comments):
+        if index in dropped:
+            continue
+        result.append(dict(comment, duplicates=comment.get('duplicates', 0) + duplicates[index]) if index in duplicates else comment)
+    stats["comments_out"] = len(result)
+    stats["folded"] = len(dropped)
+    return result, stats
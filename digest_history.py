@@ -1,53 +1,296 @@
+import html
 import json
 import os
+import re
+import sqlite3
+import threading
 from datetime import datetime
 
-HISTORY_FILE = 'digest_history.json'
-
-def load_digest_history():
-    """Loads the digest history from a JSON file."""
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Warning: Could not decode JSON from {HISTORY_FILE}. Returning empty history.")
-            return []
-    return []
-
-def save_digest_history(history):
-    """Saves the digest history to a JSON file."""
-    try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=4, ensure_ascii=False)
-    except IOError as e:
-        print(f"Error saving history to {HISTORY_FILE}: {e}")
-
-def add_digest_to_history(url, method, model, detail_level, digest_content, title, enable_text_analysis=False):
-    """Adds a new digest entry to the history."""
-    history = load_digest_history()
+HISTORY_DB_FILE = 'digest_history.db'
+HISTORY_FILE = 'digest_history.json' # Legacy history format, migrated into HISTORY_DB_FILE once
+
+_connection = None
+_fts_available = False # Whether SQLite was built with FTS5; search falls back to LIKE otherwise
+_lock = threading.RLock() # Serializes access to the shared connection
+
+# Columns needed to list history entries; digest_content is only loaded on demand
+_SUMMARY_COLUMNS = "id, timestamp, url, title, method, model, detail_level, enable_text_analysis"
+
+def _get_connection():
+    """Opens the history database on first use, creating the schema and migrating the legacy JSON file."""
+    global _connection, _fts_available
+    if _connection is None:
+        conn = sqlite3.connect(HISTORY_DB_FILE, timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS digests (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    url TEXT,
+                    title TEXT,
+                    method TEXT,
+                    model TEXT,
+                    detail_level TEXT,
+                    enable_text_analysis INTEGER NOT NULL DEFAULT 0,
+                    digest_content TEXT,
+                    submission_id TEXT,
+                    comment_fingerprints TEXT
+                )
+            """)
+            _add_missing_columns(conn)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_digests_timestamp ON digests (timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_digests_url ON digests (url)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_digests_method ON digests (method)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_digests_submission ON digests (submission_id)")
+        _fts_available = _create_fts_index(conn)
+        _migrate_json_history(conn)
+        _connection = conn
+    return _connection
+
+def _add_missing_columns(conn):
+    """Adds the columns used by incremental digests to databases created before they existed."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(digests)")}
+    for column in ("submission_id", "comment_fingerprints"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE digests ADD COLUMN {column} TEXT")
+
+def _create_fts_index(conn):
+    """Creates the FTS5 full-text index over titles, URLs and digests, kept in sync by triggers."""
+    try:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'digests_fts'").fetchone()
+        with conn:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS digests_fts USING fts5(
+                    title, url, digest_content, content='digests', content_rowid='id'
+                )
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS digests_fts_insert AFTER INSERT ON digests BEGIN
+                    INSERT INTO digests_fts (rowid, title, url, digest_content) VALUES (new.id, new.title, new.url, new.digest_content);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS digests_fts_delete AFTER DELETE ON digests BEGIN
+                    INSERT INTO digests_fts (digests_fts, rowid, title, url, digest_content) VALUES ('delete', old.id, old.title, old.url, old.digest_content);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS digests_fts_update AFTER UPDATE ON digests BEGIN
+                    INSERT INTO digests_fts (digests_fts, rowid, title, url, digest_content) VALUES ('delete', old.id, old.title, old.url, old.digest_content);
+                    INSERT INTO digests_fts (rowid, title, url, digest_content) VALUES (new.id, new.title, new.url, new.digest_content);
+                END
+            """)
+            if not exists: # Index entries written before full-text search existed
+                conn.execute("INSERT INTO digests_fts (digests_fts) VALUES ('rebuild')")
+        return True
+    except sqlite3.OperationalError as e:
+        print(f"Warning: Full-text search unavailable ({e}). History search will use slower substring matching.")
+        return False
+
+def _migrate_json_history(conn):
+    """Imports entries from the legacy digest_history.json, then renames it so this only runs once."""
+    if not os.path.exists(HISTORY_FILE):
+        return
+    try:
+        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+            legacy_history = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Warning: Could not read legacy history from {HISTORY_FILE}: {e}. Skipping migration.")
+        return
+
+    with conn:
+        # The JSON list is newest first; insert oldest first so ids follow chronological order
+        conn.executemany(
+            "INSERT INTO digests (timestamp, url, title, method, model, detail_level, enable_text_analysis, digest_content) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (entry.get("timestamp", ""), entry.get("url"), entry.get("title"), entry.get("method"), entry.get("model"),
+                 entry.get("detail_level"), int(bool(entry.get("enable_text_analysis", False))), entry.get("digest_content"))
+                for entry in reversed(legacy_history)
+            ]
+        )
+    os.replace(HISTORY_FILE, HISTORY_FILE + '.migrated')
+    print(f"Migrated {len(legacy_history)} history entries from {HISTORY_FILE} to {HISTORY_DB_FILE}.")
+
+def _row_to_entry(row):
+    entry = dict(row)
+    entry["enable_text_analysis"] = bool(entry.get("enable_text_analysis"))
+    return entry
+
+def count_digest_history():
+    """Returns the number of entries in the history."""
+    try:
+        with _lock:
+            return _get_connection().execute("SELECT COUNT(*) FROM digests").fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"Error counting history in {HISTORY_DB_FILE}: {e}")
+        return 0
+
+def load_digest_history_page(before_id=None, limit=100):
+    """Loads up to `limit` entries older than `before_id` (newest first), without their digest content."""
+    query = f"SELECT {_SUMMARY_COLUMNS} FROM digests"
+    params = []
+    if before_id is not None:
+        query += " WHERE id < ?"
+        params.append(before_id)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    try:
+        with _lock:
+            rows = _get_connection().execute(query, params).fetchall()
+    except sqlite3.Error as e:
+        print(f"Error loading history from {HISTORY_DB_FILE}: {e}")
+        return []
+    return [_row_to_entry(row) for row in rows]
+
+def get_digest_content(entry_id):
+    """Returns only the digest text of a history entry, or None if it does not exist."""
+    try:
+        with _lock:
+            row = _get_connection().execute("SELECT digest_content FROM digests WHERE id = ?", (entry_id,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"Error reading history entry {entry_id}: {e}")
+        return None
+    return row[0] if row else None
+
+def _to_fts_query(query):
+    """Turns free text into an FTS5 query: every word must match, the last one as a prefix."""
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return " ".join(quoted)
+
+def _highlight(text, start_mark, end_mark, as_html):
+    if as_html:
+        text = html.escape(text)
+        return text.replace(start_mark, "<b>").replace(end_mark, "</b>")
+    return text
+
+def search_digest_history(query, limit=100, as_html=False):
+    """Searches titles, URLs and digest content, best matches first.
+
+    Each result is a history entry (without digest_content) with an extra 'snippet'
+    showing the matched text. Matches are wrapped in [ ] or, with as_html, in <b></b>.
+    """
+    # Control characters as markers survive html.escape and never appear in digests
+    start_mark, end_mark = ("\x02", "\x03") if as_html else ("[", "]")
+    columns = ", ".join(f"d.{column.strip()}" for column in _SUMMARY_COLUMNS.split(","))
+    try:
+        with _lock:
+            conn = _get_connection()
+            if _fts_available:
+                fts_query = _to_fts_query(query)
+                if fts_query is None:
+                    return []
+                rows = conn.execute(f"""
+                    SELECT {columns}, snippet(digests_fts, -1, ?, ?, '...', 12) AS snippet
+                    FROM digests_fts JOIN digests d ON d.id = digests_fts.rowid
+                    WHERE digests_fts MATCH ?
+                    ORDER BY bm25(digests_fts, 10.0, 5.0, 1.0)
+                    LIMIT ?
+                """, (start_mark, end_mark, fts_query, limit)).fetchall()
+            else:
+                pattern = f"%{query.strip()}%"
+                rows = conn.execute(f"""
+                    SELECT {columns}, substr(d.digest_content, 1, 120) AS snippet FROM digests d
+                    WHERE d.title LIKE ? OR d.url LIKE ? OR d.digest_content LIKE ?
+                    ORDER BY d.id DESC LIMIT ?
+                """, (pattern, pattern, pattern, limit)).fetchall()
+    except sqlite3.Error as e:
+        print(f"Error searching history in {HISTORY_DB_FILE}: {e}")
+        return []
+
+    results = []
+    for row in rows:
+        entry = _row_to_entry(row)
+        entry["snippet"] = _highlight((entry.get("snippet") or "").replace("\n", " "), start_mark, end_mark, as_html)
+        results.append(entry)
+    return results
+
+def add_digest_to_history(url, method, model, detail_level, digest_content, title, enable_text_analysis=False,
+                          submission_id=None, comment_fingerprints=None):
+    """Adds a new digest entry to the history and returns its id.
+
+    `submission_id` and `comment_fingerprints` (see incremental.py) let later digests of the
+    thread send only the comments that changed since this one.
+    """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    new_entry = {
-        "timestamp": timestamp,
-        "url": url,
-        "title": title,
-        "method": method,
-        "model": model,
-        "detail_level": detail_level,
-        "enable_text_analysis": enable_text_analysis, # Store the new flag
-        "digest_content": digest_content
-    }
-    
-    history.insert(0, new_entry) # Add to the beginning of the list
-    save_digest_history(history)
-
-def delete_digest_from_history(timestamp):
-    """Deletes a digest entry from the history by its timestamp."""
-    history = load_digest_history()
-    history = [entry for entry in history if entry.get("timestamp") != timestamp]
-    save_digest_history(history)
+    fingerprints_json = json.dumps(comment_fingerprints) if comment_fingerprints is not None else None
+    try:
+        with _lock:
+            conn = _get_connection()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO digests (timestamp, url, title, method, model, detail_level, enable_text_analysis, digest_content, submission_id, comment_fingerprints) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (timestamp, url, title, method, model, detail_level, int(bool(enable_text_analysis)), digest_content, submission_id, fingerprints_json)
+                )
+            return cursor.lastrowid
+    except sqlite3.Error as e:
+        print(f"Error saving history to {HISTORY_DB_FILE}: {e}")
+        return None
+
+def get_latest_digest_state(submission_id, methods, detail_level, enable_text_analysis):
+    """Returns the newest digest of a thread made with one of `methods` and the same template options, or None.
+
+    The entry has its 'comment_fingerprints' decoded; entries saved without them are skipped.
+    """
+    placeholders = ", ".join("?" for _ in methods)
+    try:
+        with _lock:
+            row = _get_connection().execute(f"""
+                SELECT id, model, digest_content, comment_fingerprints FROM digests
+                WHERE submission_id = ? AND comment_fingerprints IS NOT NULL AND method IN ({placeholders})
+                  AND detail_level IS ? AND enable_text_analysis = ?
+                ORDER BY id DESC LIMIT 1
+            """, (submission_id, *methods, detail_level, int(bool(enable_text_analysis)))).fetchone()
+    except sqlite3.Error as e:
+        print(f"Error reading history in {HISTORY_DB_FILE}: {e}")
+        return None
+    if not row:
+        return None
+    entry = dict(row)
+    try:
+        entry["comment_fingerprints"] = json.loads(entry["comment_fingerprints"])
+    except json.JSONDecodeError:
+        print(f"Warning: Could not decode comment fingerprints of history entry {entry['id']}. Ignoring it.")
+        return None
+    return entry
+
+def get_digested_submission_ids(submission_ids):
+    """Returns the subset of `submission_ids` that already have a digest in the history."""
+    submission_ids = list(submission_ids)
+    if not submission_ids:
+        return set()
+    placeholders = ", ".join("?" for _ in submission_ids)
+    try:
+        with _lock:
+            rows = _get_connection().execute(f"SELECT DISTINCT submission_id FROM digests WHERE submission_id IN ({placeholders})", submission_ids).fetchall()
+    except sqlite3.Error as e:
+        print(f"Error reading history in {HISTORY_DB_FILE}: {e}")
+        return set()
+    return {row[0] for row in rows}
+
+def delete_digest_from_history(entry_id):
+    """Deletes a digest entry from the history by its id."""
+    try:
+        with _lock:
+            conn = _get_connection()
+            with conn:
+                conn.execute("DELETE FROM digests WHERE id = ?", (entry_id,))
+    except sqlite3.Error as e:
+        print(f"Error deleting history entry {entry_id}: {e}")
 
 def clear_all_history():
     """Clears all entries from the digest history."""
-    save_digest_history([])
+    try:
+        with _lock:
+            conn = _get_connection()
+            with conn:
+                conn.execute("DELETE FROM digests")
+    except sqlite3.Error as e:
+        print(f"Error clearing history in {HISTORY_DB_FILE}: {e}")
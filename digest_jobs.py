@@ -0,0 +1,142 @@
+import itertools
+import threading
+from concurrent.futures import CancelledError
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from reddit_digest import get_reddit_digest_async, submit_digest_coroutine, DigestCancelled
+
+# Human-readable labels for the stages reported by get_reddit_digest
+STAGE_LABELS = {
+    "queued": "Queued",
+    "fetching": "Fetching Reddit thread...",
+    "building_prompt": "Building prompt...",
+    "summarizing": "Summarizing..."
+}
+
+class DigestJobSignals(QObject):
+    # Signals are emitted from worker threads and delivered on the GUI thread
+    progress = pyqtSignal(int, str) # job id, stage
+    chunk = pyqtSignal(int, str) # job id, streamed summary text
+    finished = pyqtSignal(int, object) # job id, result dict
+    cancelled = pyqtSignal(int) # job id
+
+class DigestJob(QRunnable):
+    """Runs one digest on the shared digest event loop and waits for it on a QThreadPool worker thread."""
+
+    def __init__(self, job_id, url, summarization_method, model_name, detail_level, enable_text_analysis, force_refresh=False):
+        super().__init__()
+        self.setAutoDelete(False) # The queue keeps a reference so queued jobs can be taken back
+        self.job_id = job_id
+        self.url = url
+        self.summarization_method = summarization_method
+        self.model_name = model_name
+        self.detail_level = detail_level
+        self.enable_text_analysis = enable_text_analysis
+        self.force_refresh = force_refresh
+        self.cancel_event = threading.Event()
+        self.future = None # Future of the running digest coroutine; cancelling it interrupts the current request
+        self.signals = DigestJobSignals()
+
+    def cancel(self):
+        self.cancel_event.set()
+        future = self.future
+        if future is not None:
+            future.cancel()
+
+    def run(self):
+        if self.cancel_event.is_set():
+            self.signals.cancelled.emit(self.job_id)
+            return
+
+        report = {}
+        try:
+            self.future = submit_digest_coroutine(get_reddit_digest_async(
+                self.url, self.summarization_method, self.model_name, self.detail_level, self.enable_text_analysis,
+                report=report,
+                progress_callback=lambda stage: self.signals.progress.emit(self.job_id, stage),
+                stream_callback=lambda text: self.signals.chunk.emit(self.job_id, text),
+                cancel_event=self.cancel_event,
+                force_refresh=self.force_refresh
+            ))
+            if self.cancel_event.is_set(): # Cancelled before the future was stored
+                self.future.cancel()
+            digest_content, model_used, title = self.future.result()
+        except (DigestCancelled, CancelledError):
+            self.signals.cancelled.emit(self.job_id)
+            return
+        except Exception as e:
+            print(f"Error running digest job {self.job_id}: {e}")
+            digest_content, model_used, title = "An unexpected error occurred while fetching Reddit content or summarizing.", None, None
+
+        self.signals.finished.emit(self.job_id, {
+            "url": self.url,
+            "method": self.summarization_method,
+            "model": model_used,
+            "detail_level": self.detail_level,
+            "enable_text_analysis": self.enable_text_analysis,
+            "digest": digest_content,
+            "title": title,
+            "report": report
+        })
+
+class DigestJobQueue(QObject):
+    """Queues digest jobs on a QThreadPool and relays their signals to the GUI thread."""
+
+    job_progress = pyqtSignal(int, str)
+    job_chunk = pyqtSignal(int, str)
+    job_finished = pyqtSignal(int, object)
+    job_cancelled = pyqtSignal(int)
+
+    def __init__(self, max_concurrent_jobs=2, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max_concurrent_jobs)
+        self.jobs = {}
+        self._job_ids = itertools.count(1)
+
+    def submit(self, url, summarization_method, model_name=None, detail_level=None, enable_text_analysis=False, force_refresh=False):
+        """Queues a digest and returns its job id."""
+        job_id = next(self._job_ids)
+        job = DigestJob(job_id, url, summarization_method, model_name, detail_level, enable_text_analysis, force_refresh)
+        job.signals.progress.connect(self.job_progress)
+        job.signals.chunk.connect(self.job_chunk)
+        job.signals.finished.connect(self._on_job_finished)
+        job.signals.cancelled.connect(self._on_job_cancelled)
+        self.jobs[job_id] = job
+        self.thread_pool.start(job)
+        self.job_progress.emit(job_id, "queued")
+        return job_id
+
+    def cancel(self, job_id):
+        """Cancels a job: queued jobs are removed, running jobs are interrupted in their current request."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.cancel()
+        if self.thread_pool.tryTake(job):
+            self._on_job_cancelled(job_id)
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    def shutdown(self):
+        """Cancels every job and drops the queued ones, so the pool has nothing left to wait for."""
+        self.cancel_all()
+        self.thread_pool.clear()
+
+    def pending_count(self):
+        """Number of jobs that are queued or running."""
+        return len(self.jobs)
+
+    def _on_job_finished(self, job_id, result):
+        job = self.jobs.pop(job_id, None)
+        if job is None:
+            return
+        if job.cancel_event.is_set(): # Cancelled during its last stage; drop the result
+            self.job_cancelled.emit(job_id)
+        else:
+            self.job_finished.emit(job_id, result)
+
+    def _on_job_cancelled(self, job_id):
+        if self.jobs.pop(job_id, None) is not None:
+            self.job_cancelled.emit(job_id)
@@ -0,0 +1,314 @@
+import argparse
+import collections
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from app_config import load_model_preferences
+
+# Override these under "server" in model_preferences.json
+SERVER_DEFAULTS = {
+    "host": "127.0.0.1", # Local only: the service has no authentication
+    "port": 8765,
+    "max_concurrent": 4, # Digests running at once; identical requests share one run and count once
+    "queue_timeout_seconds": 30.0, # How long a request waits for a free slot before getting 503
+    "max_body_bytes": 64 * 1024
+}
+
+SUMMARIZATION_METHODS = ("top5", "openai", "gemini", "extractive", "race")
+DETAIL_LEVELS = ("concise", "standard", "detailed")
+
+# Report entries left out of responses: large and only meant for the history
+_PRIVATE_REPORT_KEYS = ("comment_fingerprints",)
+
+def get_server_config(preferences=None, overrides=None):
+    """Merges the defaults with preference overrides and explicit (e.g. command-line) overrides."""
+    config = dict(SERVER_DEFAULTS)
+    config.update((preferences or {}).get("server", {}))
+    config.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    return config
+
+class SingleFlight:
+    """Runs a function once per key at a time: callers arriving while it runs wait for and share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {} # key -> [done event, result, exception, requests of the callers]
+
+    def do(self, key, function, request=None, finish=None):
+        """Returns (result, shared), where `shared` is True if the result came from another caller's run.
+
+        Every caller's `request` is collected. Once the run stops accepting callers, the leader calls
+        `finish(result, requests)` and its return value becomes the shared result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None, []]
+            call[3].append(request)
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1], True
+
+        try:
+            try:
+                result = function()
+            finally:
+                with self._lock:
+                    del self._calls[key] # Later requests start a fresh run
+            call[1] = finish(result, call[3]) if finish is not None else result
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            call[0].set()
+        return call[1], False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+class ServiceBusy(Exception):
+    """Raised when no digest slot frees up within the queue timeout."""
+
+class DigestService:
+    """The server-independent part of the service: validation, coalescing, concurrency limit and metrics.
+
+    `digest_function` has the signature of reddit_digest.get_reddit_digest; pass a stand-in to run
+    the service without Reddit or model access.
+    """
+
+    def __init__(self, config, digest_function=None, is_error_function=None, save_function=None):
+        if digest_function is None or is_error_function is None:
+            from reddit_digest import get_reddit_digest, is_error_digest
+            digest_function = digest_function or get_reddit_digest
+            is_error_function = is_error_function or is_error_digest
+        if save_function is None:
+            from digest_history import add_digest_to_history
+            save_function = add_digest_to_history
+        self.config = config
+        self.digest_function = digest_function
+        self.is_error_function = is_error_function
+        self.save_function = save_function
+        self.flight = SingleFlight()
+        self._slots = threading.BoundedSemaphore(max(1, config["max_concurrent"]))
+        self._metrics_lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=1000) # Seconds per digest run, most recent last
+        self.started = time.time()
+        self.metrics = {"requests": 0, "coalesced": 0, "digests": 0, "errors": 0, "rejected": 0, "queued": 0, "running": 0}
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self.metrics[name] += amount
+
+    @staticmethod
+    def parse_request(params):
+        """Validates request parameters and returns the digest arguments; raises ValueError with the reason."""
+        url = (params.get("url") or "").strip()
+        if not url:
+            raise ValueError("'url' is required")
+        method = params.get("method") or "top5"
+        if method not in SUMMARIZATION_METHODS:
+            raise ValueError(f"'method' must be one of {', '.join(SUMMARIZATION_METHODS)}")
+        if method == "race" and params.get("model"):
+            raise ValueError("'model' cannot be used with the race method, which takes its models from the \"race\" preferences")
+        detail_level = params.get("detail_level") or "standard"
+        if detail_level not in DETAIL_LEVELS:
+            raise ValueError(f"'detail_level' must be one of {', '.join(DETAIL_LEVELS)}")
+
+        def flag(name):
+            value = params.get(name)
+            if isinstance(value, str):
+                return value.lower() in ("1", "true", "yes")
+            return None if value is None else bool(value)
+
+        return {
+            "url": url,
+            "summarization_method": method,
+            "model_name": params.get("model") or None,
+            "detail_level": detail_level,
+            "enable_text_analysis": bool(flag("enable_text_analysis")),
+            "force_refresh": bool(flag("force_refresh")),
+            "expand_comments": flag("expand_comments"),
+            "incremental": flag("incremental"),
+            "save_history": bool(flag("save_history"))
+        }
+
+    def _run_digest(self, arguments):
+        waited_since = time.perf_counter()
+        self._count("queued")
+        acquired = self._slots.acquire(timeout=self.config["queue_timeout_seconds"])
+        self._count("queued", -1)
+        if not acquired:
+            self._count("rejected")
+            raise ServiceBusy()
+
+        self._count("running")
+        started = time.perf_counter()
+        report = {}
+        try:
+            digest, model, title = self.digest_function(
+                arguments["url"], arguments["summarization_method"], arguments["model_name"], arguments["detail_level"],
+                arguments["enable_text_analysis"], report=report, force_refresh=arguments["force_refresh"],
+                expand_comments=arguments["expand_comments"], incremental=arguments["incremental"]
+            )
+        finally:
+            self._slots.release()
+            self._count("running", -1)
+        seconds = time.perf_counter() - started
+        with self._metrics_lock:
+            self.metrics["digests"] += 1
+            self._latencies.append(seconds)
+
+        report["queue_seconds"] = started - waited_since
+        report["digest_seconds"] = seconds
+        return {"status": "error" if self.is_error_function(digest) else "ok", "digest": digest, "model": model, "title": title, "report": report}
+
+    def _save_once(self, arguments, response, save_requests):
+        # Runs on the leader once no more callers can join: one history entry however many callers asked for it
+        report = response["report"]
+        if any(save_requests) and response["status"] == "ok" and report.get("incremental", {}).get("mode") != "unchanged":
+            history_id = self.save_function(arguments["url"], arguments["summarization_method"], response["model"], arguments["detail_level"],
+                                            response["digest"], response["title"], arguments["enable_text_analysis"],
+                                            report.get("submission_id"), report.get("comment_fingerprints"))
+            response = dict(response, history_id=history_id)
+        return response
+
+    def digest(self, arguments):
+        """Runs (or joins an identical running) digest and returns the response dict."""
+        self._count("requests")
+        # Same URL and digest parameters: one fetch, one model call and at most one history entry
+        key = json.dumps({name: value for name, value in arguments.items() if name != "save_history"}, sort_keys=True)
+        response, shared = self.flight.do(key, lambda: self._run_digest(arguments), arguments["save_history"],
+                                          lambda result, save_requests: self._save_once(arguments, result, save_requests))
+        if shared:
+            self._count("coalesced")
+        report = response["report"] # Shared with the other callers: read only
+        response = dict(response, coalesced=shared, report={name: value for name, value in report.items() if name not in _PRIVATE_REPORT_KEYS})
+        if response["status"] == "error":
+            self._count("errors")
+        return response
+
+    def get_metrics(self):
+        from rate_limiter import get_rate_limit_stats
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+            latencies = sorted(self._latencies)
+        if latencies:
+            metrics["digest_seconds"] = {f"p{int(fraction * 100)}": latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+                                         for fraction in (0.5, 0.9, 0.99)}
+        metrics["in_flight"] = self.flight.in_flight()
+        metrics["max_concurrent"] = self.config["max_concurrent"]
+        metrics["uptime_seconds"] = time.time() - self.started
+        metrics["rate_limits"] = get_rate_limit_stats()
+        return metrics
+
+class DigestRequestHandler(BaseHTTPRequestHandler):
+    """GET or POST /digest, GET /healthz and GET /metrics; every response is JSON."""
+
+    server_version = "Reddigest"
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle_digest(self, params):
+        service = self.server.service
+        try:
+            arguments = service.parse_request(params)
+        except ValueError as e:
+            self._send_json(400, {"status": "error", "error": str(e)})
+            return
+        try:
+            response = service.digest(arguments)
+        except ServiceBusy:
+            self._send_json(503, {"status": "error", "error": "Too many digests in progress, try again later."}, {"Retry-After": "5"})
+            return
+        except Exception as e:
+            print(f"Error serving digest of {arguments['url']}: {e}")
+            self._send_json(500, {"status": "error", "error": "An unexpected error occurred while digesting the thread."})
+            return
+        if response["status"] == "ok":
+            status = 200
+        elif response["digest"] and response["digest"].startswith("Invalid Reddit URL:"):
+            status = 400
+        else:
+            status = 502 # Reddit or the model provider failed
+        self._send_json(status, response)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/healthz":
+            self._send_json(200, {"status": "ok", "uptime_seconds": time.time() - self.server.service.started})
+        elif parsed.path == "/metrics":
+            self._send_json(200, self.server.service.get_metrics())
+        elif parsed.path == "/digest":
+            self._handle_digest({name: values[-1] for name, values in parse_qs(parsed.query).items()})
+        else:
+            self._send_json(404, {"status": "error", "error": "Not found. Use /digest, /healthz or /metrics."})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/digest":
+            self._send_json(404, {"status": "error", "error": "Not found. POST to /digest."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"status": "error", "error": "Invalid Content-Length header."})
+            return
+        if length > self.server.service.config["max_body_bytes"]:
+            self._send_json(413, {"status": "error", "error": "Request body too large."})
+            return
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self._send_json(400, {"status": "error", "error": f"Invalid JSON body: {e}"})
+            return
+        self._handle_digest(params)
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+def create_server(config=None, digest_function=None, is_error_function=None, save_function=None):
+    """Builds the HTTP server (not started); stand-in functions can replace the real digest pipeline and history."""
+    config = config or get_server_config(load_model_preferences())
+    server = ThreadingHTTPServer((config["host"], config["port"]), DigestRequestHandler)
+    server.daemon_threads = True
+    server.service = DigestService(config, digest_function, is_error_function, save_function)
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Reddit digests as JSON over HTTP.")
+    parser.add_argument("--host", help=f"Address to listen on (default: {SERVER_DEFAULTS['host']})")
+    parser.add_argument("-p", "--port", type=int, help=f"Port to listen on (default: {SERVER_DEFAULTS['port']})")
+    parser.add_argument("-c", "--max-concurrent", type=int, help="Maximum number of digests running at once")
+    args = parser.parse_args(argv)
+
+    config = get_server_config(load_model_preferences(), {"host": args.host, "port": args.port, "max_concurrent": args.max_concurrent})
+    server = create_server(config)
+    print(f"Serving digests on http://{config['host']}:{server.server_address[1]}/digest (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
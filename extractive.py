@@ -0,0 +1,333 @@
+# Local extractive summarization: TF-IDF sentence vectors ranked by TextRank centrality
+import math
+import re
+import time
+from chunking import estimate_tokens
+from summary_template import build_summary_template
+from numpy_support import load_numpy
+
+# NumPy powers the vectorized TextRank; a slower centroid ranking is used without it.
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each even few for from further get got had has have having he her here
+hers herself him himself his how i if in into is it its itself just like me more most my myself no nor not now of off
+on once one only or other our ours ourselves out over own really same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up very was we were what when where
+which while who whom why will with would you your yours yourself yourselves im ive dont doesnt didnt cant wont isnt
+thats youre theyre just also yeah yes lol
+""".split())
+
+# Override these under "extractive_presummary" in model_preferences.json
+PRESUMMARY_DEFAULTS = {
+    "enabled": False, # Shrink AI prompts to the most central sentences before summarizing
+    "target_tokens": 4000 # Size of the comment text kept for the prompt
+}
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+_WORD = re.compile(r"[a-z0-9](?:[a-z0-9'+#-]*[a-z0-9+#])?")
+
+def get_presummary_config(preferences=None, enabled=None):
+    """Merges the defaults with preference overrides; `enabled` forces the stage on or off."""
+    config = dict(PRESUMMARY_DEFAULTS)
+    config.update((preferences or {}).get("extractive_presummary", {}))
+    if enabled is not None:
+        config["enabled"] = enabled
+    return config
+
+def split_sentences(text):
+    """Splits text into sentences on end punctuation and line breaks."""
+    return [sentence.strip() for sentence in _SENTENCE_SPLIT.split(text) if sentence and sentence.strip()]
+
+def tokenize(text):
+    """Lowercases text and returns its content words."""
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+def _tfidf_triplets(token_lists):
+    """Builds an L2-normalized sparse TF-IDF matrix as parallel (row, column, value) sequences."""
+    vocabulary = {}
+    token_rows = []
+    token_columns = []
+    for row, tokens in enumerate(token_lists):
+        token_rows.extend([row] * len(tokens))
+        token_columns.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+
+    n = len(token_lists)
+    vocabulary_size = len(vocabulary)
+    np = load_numpy()
+    if np is not None and token_columns:
+        # Count (row, column) pairs and weight them in vectorized form
+        keys, counts = np.unique(np.asarray(token_rows, dtype=np.int64) * vocabulary_size + np.asarray(token_columns, dtype=np.int64), return_counts=True)
+        rows = keys // vocabulary_size
+        columns = keys % vocabulary_size
+        idf = np.log(n / np.bincount(columns, minlength=vocabulary_size).clip(min=1)) + 1.0
+        weights = (1 + np.log(counts)) * idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+        return rows, columns, weights / norms[rows], vocabulary_size
+
+    term_counts = [{} for _ in range(n)]
+    for row, column in zip(token_rows, token_columns):
+        term_counts[row][column] = term_counts[row].get(column, 0) + 1
+    document_frequency = [0] * vocabulary_size
+    for counts in term_counts:
+        for column in counts:
+            document_frequency[column] += 1
+
+    idf = [math.log(n / df) + 1.0 for df in document_frequency]
+    rows, columns, values = [], [], []
+    for row, counts in enumerate(term_counts):
+        weights = {column: (1 + math.log(count)) * idf[column] for column, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        for column, weight in weights.items():
+            rows.append(row)
+            columns.append(column)
+            values.append(weight / norm)
+    return rows, columns, values, vocabulary_size
+
+def _textrank_numpy(rows, columns, values, n, vocabulary_size, iterations=30, damping=0.85):
+    """Runs weighted PageRank on the cosine-similarity graph without materializing the n x n matrix.
+
+    With X the normalized TF-IDF matrix, similarities are S = X Xᵀ minus the diagonal, so
+    each product S·v costs two sparse passes over X: O(non-zeros) per iteration.
+    """
+    np = load_numpy()
+    rows = np.asarray(rows, dtype=np.int64)
+    columns = np.asarray(columns, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    self_similarity = np.bincount(rows, weights=values * values, minlength=n)
+
+    def similarity_product(vector):
+        term_totals = np.bincount(columns, weights=values * vector[rows], minlength=vocabulary_size)
+        return np.bincount(rows, weights=values * term_totals[columns], minlength=n) - self_similarity * vector
+
+    degree = similarity_product(np.ones(n))
+    inverse_degree = np.divide(1.0, degree, out=np.zeros(n), where=degree > 1e-12)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        scores = (1 - damping) / n + damping * similarity_product(scores * inverse_degree)
+    return scores.tolist()
+
+def _centroid_scores(rows, columns, values, n):
+    """Pure-Python fallback: scores each sentence by its similarity to the thread's centroid vector."""
+    centroid = {}
+    for column, value in zip(columns, values):
+        centroid[column] = centroid.get(column, 0.0) + value
+    scores = [0.0] * n
+    for row, column, value in zip(rows, columns, values):
+        scores[row] += value * centroid[column]
+    return scores
+
+def rank_sentences(sentences, token_lists=None):
+    """Returns a centrality score for every sentence (TextRank with NumPy, centroid similarity otherwise)."""
+    if token_lists is None:
+        token_lists = [tokenize(sentence) for sentence in sentences]
+    rows, columns, values, vocabulary_size = _tfidf_triplets(token_lists)
+    if not len(values):
+        return [0.0] * len(sentences)
+    if load_numpy() is not None:
+        return _textrank_numpy(rows, columns, values, len(sentences), vocabulary_size)
+    return _centroid_scores(rows, columns, values, len(sentences))
+
+def presummarize_comments(comment_bodies, target_tokens):
+    """Keeps only the most central sentences of a thread, up to target_tokens.
+
+    Returns the reduced body of every comment, in the same order ("" when none of its
+    sentences were kept), and a stats dict describing the reduction.
+    """
+    started = time.perf_counter()
+    sentences = [] # (comment index, sentence)
+    for index, body in enumerate(comment_bodies):
+        sentences.extend((index, sentence) for sentence in split_sentences(body))
+
+    token_counts = [estimate_tokens(sentence) for _, sentence in sentences]
+    input_tokens = sum(token_counts)
+    stats = {"input_tokens": input_tokens, "sentences_in": len(sentences)}
+
+    if input_tokens <= target_tokens:
+        kept = set(range(len(sentences)))
+    else:
+        scores = rank_sentences([sentence for _, sentence in sentences])
+        kept = set()
+        used = 0
+        for position in sorted(range(len(sentences)), key=lambda position: scores[position], reverse=True):
+            if used + token_counts[position] <= target_tokens:
+                kept.add(position)
+                used += token_counts[position]
+
+    reduced = [[] for _ in comment_bodies]
+    for position, (index, sentence) in enumerate(sentences):
+        if position in kept:
+            reduced[index].append(sentence)
+
+    output_tokens = sum(token_counts[position] for position in kept)
+    stats.update({
+        "output_tokens": output_tokens,
+        "sentences_out": len(kept),
+        "reduction": 1 - output_tokens / input_tokens if input_tokens else 0.0,
+        "seconds": time.perf_counter() - started
+    })
+    return [" ".join(body_sentences) for body_sentences in reduced], stats
+
+# Small sentiment lexicon for the offline "extractive" method's text analysis
+POSITIVE_WORDS = frozenset("""
+good great awesome excellent amazing love loved best better nice helpful useful thanks thank works worked working
+recommend recommended perfect easy fast happy glad impressive solid reliable favorite fantastic agree fixed success
+""".split())
+NEGATIVE_WORDS = frozenset("""
+bad terrible awful worst worse hate hated broken bug buggy slow hard difficult problem problems issue issues fail
+failed fails error errors wrong annoying disappointed disappointing avoid useless crash crashes expensive scam disagree
+""".split())
+
+# Cue words that place a central sentence in one of the template's discussion sections
+SOLUTION_CUES = frozenset("try use using install switch recommend suggest should fix fixed solution instead workaround".split())
+WARNING_CUES = frozenset("avoid careful warning beware never risk risky dangerous don't caution backup lose".split())
+DEBATE_CUES = frozenset("however but disagree although though depends whereas unless actually".split())
+
+# Number of key sentences and representative comments per detail level
+EXTRACTIVE_SIZES = {
+    "concise": {"sentences": 3, "comments": 0, "terms": 5},
+    "standard": {"sentences": 5, "comments": 3, "terms": 10},
+    "detailed": {"sentences": 10, "comments": 5, "terms": 15}
+}
+
+def _sentiment_section(token_lists):
+    positive = {}
+    negative = {}
+    for tokens in token_lists:
+        for token in tokens:
+            if token in POSITIVE_WORDS:
+                positive[token] = positive.get(token, 0) + 1
+            elif token in NEGATIVE_WORDS:
+                negative[token] = negative.get(token, 0) + 1
+    positive_total = sum(positive.values())
+    negative_total = sum(negative.values())
+    total = positive_total + negative_total
+    if not total or abs(positive_total - negative_total) / total < 0.2:
+        overall = "Mixed" if total else "Neutral"
+    else:
+        overall = "Positive" if positive_total > negative_total else "Negative"
+
+    def top_words(counts):
+        return ", ".join(word for word, _ in sorted(counts.items(), key=lambda item: item[1], reverse=True)[:3]) or "None found"
+
+    return "\n".join([
+        f"*   **Overall Sentiment:** {overall} ({positive_total} positive / {negative_total} negative terms)",
+        f"*   **Key Positive Aspects:** {top_words(positive)}",
+        f"*   **Key Negative Aspects:** {top_words(negative)}"
+    ])
+
+def _fill_template(template, title, sections):
+    """Keeps the template's headings and separators, replacing each heading's placeholders with sections[heading]."""
+    blocks = []
+    for line in template.strip().splitlines():
+        if line == "---":
+            blocks.append(line)
+        elif line.startswith("# "):
+            blocks.append(f"# Reddit Thread Summary: {title}")
+        elif line.startswith("#"):
+            blocks.append([line, False])
+        elif line.strip() and isinstance(blocks[-1], list):
+            blocks[-1][1] = True # The heading has placeholder content to fill
+
+    rendered = []
+    for block in blocks:
+        if isinstance(block, list):
+            heading, has_content = block
+            block = f"{heading}\n\n{sections.get(heading.lstrip('#').strip()) or 'None found.'}" if has_content else heading
+        rendered.append(block)
+    return "\n\n".join(rendered) + "\n"
+
+def _bullets(lines):
+    return "\n".join(f"*   {line}" for line in lines)
+
+def summarize_extractive(comment_bodies, detail_level="standard", submission_data=None, enable_text_analysis=False, post_text=""):
+    """Fills the summary template from local computation only: no API key or network needed.
+
+    Key sentences come from TextRank centrality, frequent terms from document frequency
+    across comments, and representative comments are those holding the most central sentences.
+    They fill the same template sections as the AI methods; discussion sections take central sentences by their cue words.
+    """
+    submission_data = submission_data or {}
+    if detail_level not in EXTRACTIVE_SIZES:
+        detail_level = "standard" # Same default for the sizes and the label below
+    sizes = EXTRACTIVE_SIZES[detail_level]
+
+    sentences = [] # (comment index, sentence)
+    for index, body in enumerate(comment_bodies):
+        sentences.extend((index, sentence) for sentence in split_sentences(body))
+    token_lists = [tokenize(sentence) for _, sentence in sentences]
+    scores = rank_sentences([sentence for _, sentence in sentences], token_lists)
+
+    # Key sentences: the most central ones, skipping very short fragments and exact repeats
+    ranked_positions = sorted(range(len(sentences)), key=lambda position: scores[position], reverse=True)
+    key_sentences = []
+    seen = set()
+    for position in ranked_positions:
+        sentence = sentences[position][1]
+        if len(token_lists[position]) < 4 or sentence.lower() in seen:
+            continue
+        seen.add(sentence.lower())
+        key_sentences.append(sentence)
+        if len(key_sentences) >= sizes["sentences"]:
+            break
+
+    # Frequent terms: in how many comments each content word appears
+    comment_frequency = {}
+    comment_terms = [set() for _ in comment_bodies]
+    for (index, _), tokens in zip(sentences, token_lists):
+        comment_terms[index].update(tokens)
+    for terms in comment_terms:
+        for term in terms:
+            comment_frequency[term] = comment_frequency.get(term, 0) + 1
+    frequent_terms = sorted(comment_frequency.items(), key=lambda item: item[1], reverse=True)[:sizes["terms"]]
+
+    # Representative comments: the ones containing the most central sentences
+    comment_scores = {}
+    for position, (index, _) in enumerate(sentences):
+        comment_scores[index] = max(comment_scores.get(index, 0.0), scores[position])
+    representative = sorted(comment_scores, key=comment_scores.get, reverse=True)[:sizes["comments"]]
+
+    # The same report as the AI methods: the sections of the summary template for this detail level
+    template, _ = build_summary_template(detail_level, enable_text_analysis)
+    has_discussion = "## Community Discussion Analysis" in template
+    post_sentences = split_sentences(post_text) if post_text else []
+    sections = {
+        "Key Information": "\n".join([
+            f"*   **Source:** {submission_data.get('url', 'N/A')}",
+            f"*   **Subreddit:** r/{submission_data.get('subreddit', 'N/A')}",
+            f"*   **Publication Date:** {submission_data.get('date', 'N/A')}",
+            f"*   **Activity:** {submission_data.get('num_comments', 'N/A')}",
+            f"*   **Summarization Method:** Extractive (local) ({detail_level})"
+        ]),
+        "Summary": " ".join(key_sentences[:3]) if key_sentences else "No key sentences found.",
+        "Central Issue": " ".join(post_sentences[:3]) if post_sentences else "The post has no text; the discussion is about its title."
+    }
+
+    if has_discussion:
+        # Central sentences sorted into the discussion sections by their cue words
+        cue_sentences = {cues: [] for cues in (SOLUTION_CUES, WARNING_CUES, DEBATE_CUES)}
+        for position in ranked_positions:
+            sentence = sentences[position][1]
+            if len(token_lists[position]) < 4 or sentence in key_sentences[:3] or any(sentence in selected for selected in cue_sentences.values()):
+                continue
+            words = set(re.findall(r"[a-z']+", sentence.lower()))
+            for cues, selected in cue_sentences.items():
+                if words & cues and len(selected) < 3:
+                    selected.append(sentence)
+                    break
+        sorted_sentences = {sentence for selected in cue_sentences.values() for sentence in selected}
+        sections["General Consensus and Best Practices"] = _bullets(sentence for sentence in key_sentences[3:] if sentence not in sorted_sentences)
+        sections["Suggested Solutions and Methods"] = _bullets(cue_sentences[SOLUTION_CUES])
+        sections["Warnings and Cautionary Points"] = _bullets(cue_sentences[WARNING_CUES])
+        sections["Tools and Products Mentioned"] = _bullets(f"**{term}:** mentioned in {count} comments" for term, count in frequent_terms)
+        sections["Points of Debate and Divergent Opinions"] = _bullets(cue_sentences[DEBATE_CUES])
+
+    # Conclusion: the most representative comments, after the remaining key sentences when no discussion section holds them
+    takeaways = [] if has_discussion else list(key_sentences[3:])
+    takeaways += [f"**Comment {rank}:** {comment_bodies[index]}" for rank, index in enumerate(representative, 1)]
+    sections["Report Conclusion"] = _bullets(takeaways)
+
+    if enable_text_analysis:
+        sections["Sentiment Analysis"] = _sentiment_section(token_lists)
+
+    return _fill_template(template, submission_data.get('title', 'N/A'), sections)
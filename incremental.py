@@ -0,0 +1,48 @@
+import hashlib
+
+# Incremental re-digests; override them under "incremental" in model_preferences.json
+INCREMENTAL_DEFAULTS = {
+    "enabled": False, # When enabled, AI digests of an already digested thread only send what changed
+    "max_changed_fraction": 0.5, # Above this share of new or edited comments, the thread is digested from scratch
+    "reply_context_chars": 150 # Length of the parent excerpt shown with a changed reply
+}
+
+# Bodies of comments taken down since the last digest; their removal is not news to summarize
+_REMOVED_BODIES = ("[deleted]", "[removed]")
+
+def get_incremental_config(preferences=None, enabled=None):
+    """Merges the defaults with preference overrides; `enabled` forces incremental digests on or off."""
+    config = dict(INCREMENTAL_DEFAULTS)
+    config.update((preferences or {}).get("incremental", {}))
+    if enabled is not None:
+        config["enabled"] = enabled
+    return config
+
+def fingerprint_comments(comments):
+    """Maps each comment id to a short hash of its body, so later digests can tell new and edited comments apart."""
+    return {comment['id']: hashlib.sha1(comment['body'].encode('utf-8')).hexdigest()[:12] for comment in comments}
+
+def select_changed_comments(comments, previous_fingerprints, config):
+    """Returns the comments that are new or edited since `previous_fingerprints`, and counts of each kind.
+
+    Changed replies lose their indentation, as their parent is usually not among them;
+    a short excerpt of the parent is attached as 'reply_to' instead.
+    """
+    bodies = {f"t1_{comment['id']}": comment['body'] for comment in comments}
+    fingerprints = fingerprint_comments(comments)
+    changed = []
+    stats = {"comments": len(comments), "new": 0, "edited": 0}
+    for comment in comments:
+        previous = previous_fingerprints.get(comment['id'])
+        if previous == fingerprints[comment['id']] or comment['body'] in _REMOVED_BODIES:
+            continue
+        kind = "new" if previous is None else "edited"
+        stats[kind] += 1
+        change = dict(comment, depth=0, change=kind)
+        parent_body = bodies.get(comment.get('parent_id'))
+        if parent_body:
+            excerpt = parent_body[:config["reply_context_chars"]].replace("\n", " ")
+            change['reply_to'] = excerpt + ("..." if len(parent_body) > config["reply_context_chars"] else "")
+        changed.append(change)
+    stats["unchanged"] = len(comments) - len(changed)
+    return changed, stats
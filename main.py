@@ -1,13 +1,18 @@
 import sys
 import os
+import html
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QCheckBox,
-    QLineEdit, QPushButton, QTextEdit, QLabel, QMessageBox, QComboBox, QDialog, QFormLayout, QListWidget, QListWidgetItem, QMenuBar, QMenu
+    QLineEdit, QPushButton, QTextEdit, QLabel, QMessageBox, QComboBox, QDialog, QFormLayout, QListView, QMenuBar, QMenu,
+    QProgressBar, QStyledItemDelegate, QStyle
 )
-from PyQt6.QtCore import Qt, QDir, QUrl
-from PyQt6.QtGui import QAction, QDesktopServices, QPixmap
-from reddit_digest import get_reddit_digest, load_model_preferences, save_model_preferences, get_available_openai_models, get_available_gemini_models, load_api_keys
-from digest_history import add_digest_to_history, load_digest_history, delete_digest_from_history
+from PyQt6.QtCore import Qt, QDir, QUrl, QAbstractListModel, QModelIndex, QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import QAction, QDesktopServices, QPixmap, QTextDocument, QTextCursor, QAbstractTextDocumentLayout, QPalette
+from reddit_digest import load_model_preferences, save_model_preferences, get_cached_openai_models, get_cached_gemini_models, load_api_keys, is_error_digest, DIGEST_STAGES
+from digest_jobs import DigestJobQueue, STAGE_LABELS
+from digest_history import add_digest_to_history, load_digest_history_page, search_digest_history, get_digest_content, delete_digest_from_history, clear_all_history
+from thread_cache import clear_thread_cache
+from summary_cache import clear_summary_cache
 from theme_manager import ThemeManager
 
 # Custom About Dialog for displaying SVG and text
@@ -57,8 +62,15 @@ class RedditDigestApp(QMainWindow): # Changed from QWidget to QMainWindow
         current_dir = os.path.dirname(os.path.abspath(__file__))
         themes_path = os.path.join(current_dir, "themes")
         QDir.addSearchPath("themes", themes_path) # Register themes directory as a Qt resource path
-        self.theme_manager = ThemeManager(QApplication.instance(), themes_path)
-        self.theme_manager.load_theme("light") # Set initial theme
+        self.theme_manager = ThemeManager(QApplication.instance(), themes_path) # Applies the light theme
+
+        # Digests run on a worker thread pool so the window stays responsive
+        self.job_queue = DigestJobQueue(parent=self)
+        self.job_queue.job_progress.connect(self.on_digest_progress)
+        self.job_queue.job_chunk.connect(self.on_digest_chunk)
+        self.job_queue.job_finished.connect(self.on_digest_finished)
+        self.job_queue.job_cancelled.connect(self.on_digest_cancelled)
+        self.streaming_job_id = None # Job whose summary is currently streaming into the output
 
         self.init_ui()
 
@@ -85,6 +97,11 @@ class RedditDigestApp(QMainWindow): # Changed from QWidget to QMainWindow
         codeberg_action.triggered.connect(self.open_codeberg_repo)
         reddigest_menu.addAction(codeberg_action)
 
+        # Clear caches action
+        clear_caches_action = QAction('Clear Cached Threads and Summaries', self)
+        clear_caches_action.triggered.connect(self.clear_caches)
+        reddigest_menu.addAction(clear_caches_action)
+
         # Create the View menu for themes
         view_menu = menubar.addMenu('View')
 
@@ -122,6 +139,8 @@ class RedditDigestApp(QMainWindow): # Changed from QWidget to QMainWindow
         self.method_combo.addItem("Top 5 Comments", "top5")
         self.method_combo.addItem("OpenAI Summary", "openai")
         self.method_combo.addItem("Google Gemini Summary", "gemini")
+        self.method_combo.addItem("Extractive Summary (Offline)", "extractive")
+        self.method_combo.addItem("Fastest of OpenAI and Gemini (Race)", "race")
         self.method_combo.currentIndexChanged.connect(self.update_model_selection)
 
         # Detail level selection
@@ -144,11 +163,28 @@ class RedditDigestApp(QMainWindow): # Changed from QWidget to QMainWindow
         self.enable_text_analysis_checkbox.setChecked(False) # Default to disabled
         self.enable_text_analysis_checkbox.setVisible(False) # Hidden by default, only for AI methods
         text_analysis_layout.addWidget(self.enable_text_analysis_checkbox)
+        self.force_refresh_checkbox = QCheckBox("Force Refresh (ignore cached thread)")
+        self.force_refresh_checkbox.setChecked(False) # Default to reusing recently fetched threads
+        text_analysis_layout.addWidget(self.force_refresh_checkbox)
         text_analysis_layout.addStretch(1) # Push checkbox to the left
 
         self.generate_button = QPushButton("Generate Digest")
         self.generate_button.clicked.connect(self.generate_digest)
 
+        # Job progress row: current stage, queue size and cancellation
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, len(DIGEST_STAGES))
+        self.progress_bar.setTextVisible(False)
+        self.progress_status_label = QLabel("")
+        self.current_stage_label = STAGE_LABELS["queued"]
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_digests)
+        progress_layout.addWidget(self.progress_bar, 1)
+        progress_layout.addWidget(self.progress_status_label)
+        progress_layout.addWidget(self.cancel_button)
+        self.set_progress_visible(False)
+
         # Digest display area
         self.digest_output = QTextEdit()
         self.digest_output.setReadOnly(True)
@@ -170,6 +206,7 @@ class RedditDigestApp(QMainWindow): # Changed from QWidget to QMainWindow
         main_layout.addLayout(controls_layout)
         main_layout.addLayout(text_analysis_layout) # Add the new checkbox row
         main_layout.addWidget(self.generate_button) # Move generate button before output
+        main_layout.addLayout(progress_layout)
         main_layout.addWidget(self.digest_output)
         
         # Add copy and preferences buttons in a horizontal layout at the bottom
@@ -183,7 +220,8 @@ class RedditDigestApp(QMainWindow): # Changed from QWidget to QMainWindow
         central_widget.setLayout(main_layout)
         
         self.model_preferences = load_model_preferences() # Load preferences on startup
-        self.update_model_selection(self.method_combo.currentIndex()) # Set initial visibility
+        # Runs once the event loop starts, so the window is painted before any API key check or warning
+        QTimer.singleShot(0, lambda: self.update_model_selection(self.method_combo.currentIndex()))
 
     def open_preferences(self):
         dialog = PreferencesDialog(self.model_preferences, self)
@@ -209,20 +247,81 @@ class RedditDigestApp(QMainWindow): # Changed from QWidget to QMainWindow
         detail_level = self.detail_combo.currentData() if self.detail_combo.isVisible() else None
         enable_text_analysis = self.enable_text_analysis_checkbox.isChecked() and self.enable_text_analysis_checkbox.isVisible()
 
-        # Call the get_reddit_digest function from reddit_digest.py
-        digest_content, actual_model_used, submission_title = get_reddit_digest(url, summarization_method, selected_model, detail_level, enable_text_analysis)
-        
+        # Queue the digest; results arrive in on_digest_finished
+        force_refresh = self.force_refresh_checkbox.isChecked()
+        self.job_queue.submit(url, summarization_method, selected_model, detail_level, enable_text_analysis, force_refresh)
+        self.update_queue_status()
+
+    def on_digest_progress(self, job_id, stage):
+        if stage in DIGEST_STAGES:
+            self.progress_bar.setValue(DIGEST_STAGES.index(stage) + 1)
+            self.current_stage_label = STAGE_LABELS[stage]
+        elif self.job_queue.pending_count() == 1: # Only show "Queued" when nothing else is running
+            self.current_stage_label = STAGE_LABELS.get(stage, stage)
+        self.update_queue_status()
+
+    def on_digest_chunk(self, job_id, text):
+        # Only one job streams into the output at a time; others show up when they finish
+        if self.streaming_job_id is None:
+            self.streaming_job_id = job_id
+            self.digest_output.clear()
+        if job_id != self.streaming_job_id:
+            return
+        cursor = self.digest_output.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        self.digest_output.setTextCursor(cursor)
+
+    def on_digest_finished(self, job_id, result):
+        digest_content = result["digest"]
+        was_streaming = self.streaming_job_id == job_id
+        if was_streaming:
+            self.streaming_job_id = None
+
         # Check if the result indicates an error from validation or other issues
         if digest_content.startswith("Invalid Reddit URL:"):
             QMessageBox.warning(self, "Input Error", digest_content)
-        elif digest_content.startswith("An error occurred while summarizing with OpenAI.") or \
-             digest_content.startswith("An error occurred while summarizing with Google Gemini.") or \
-             digest_content.startswith("An unexpected error occurred while fetching Reddit content or summarizing."):
+        elif is_error_digest(digest_content):
+            if was_streaming:
+                self.digest_output.clear() # Drop the partial output of the failed stream
             QMessageBox.warning(self, "Processing Error", digest_content)
         else:
-            self.digest_output.setText(digest_content)
-            # Add to history after successful generation
-            add_digest_to_history(url, summarization_method, actual_model_used, detail_level, digest_content, submission_title)
+            self.digest_output.setText(digest_content) # Replace the streamed text with the final digest
+            # Add to history once the job has completed successfully, unless it returned the unchanged previous digest
+            if result["report"].get("incremental", {}).get("mode") != "unchanged":
+                add_digest_to_history(result["url"], result["method"], result["model"], result["detail_level"],
+                                      digest_content, result["title"], result["enable_text_analysis"],
+                                      result["report"].get("submission_id"), result["report"].get("comment_fingerprints"))
+        self.update_queue_status()
+
+    def on_digest_cancelled(self, job_id):
+        if self.streaming_job_id == job_id:
+            self.streaming_job_id = None
+        self.update_queue_status()
+
+    def cancel_digests(self):
+        self.job_queue.cancel_all()
+
+    def update_queue_status(self):
+        pending = self.job_queue.pending_count()
+        self.set_progress_visible(pending > 0)
+        if pending == 0:
+            self.progress_bar.setValue(0)
+            self.current_stage_label = STAGE_LABELS["queued"]
+            return
+        status = self.current_stage_label
+        if pending > 1:
+            status += f" ({pending - 1} more queued)"
+        self.progress_status_label.setText(status)
+
+    def set_progress_visible(self, visible):
+        self.progress_bar.setVisible(visible)
+        self.progress_status_label.setVisible(visible)
+        self.cancel_button.setVisible(visible)
+
+    def closeEvent(self, event):
+        self.job_queue.shutdown()
+        super().closeEvent(event)
 
     def update_model_selection(self, index):
         selected_method = self.method_combo.itemData(index)
@@ -230,11 +329,12 @@ class RedditDigestApp(QMainWindow): # Changed from QWidget to QMainWindow
         self.detail_label.setVisible(False)
         self.enable_text_analysis_checkbox.setVisible(False) # Hide by default
 
-        if selected_method in ["openai", "gemini"]:
+        if selected_method in ["openai", "gemini", "extractive", "race"]:
             self.detail_combo.setVisible(True)
             self.detail_label.setVisible(True)
-            self.enable_text_analysis_checkbox.setVisible(True) # Show for AI methods
-            
+            self.enable_text_analysis_checkbox.setVisible(True) # Show for summary methods
+
+        if selected_method in ["openai", "gemini"]:
             api_keys = load_api_keys()
             if selected_method == "openai":
                 if not api_keys.get('openai_api_key') or api_keys.get('openai_api_key') == "YOUR_OPENAI_API_KEY":
@@ -264,40 +364,54 @@ class RedditDigestApp(QMainWindow): # Changed from QWidget to QMainWindow
         url = QUrl("https://codeberg.org/Medenor/reddigest")
         QDesktopServices.openUrl(url)
 
+    def clear_caches(self):
+        reply = QMessageBox.question(self, 'Confirm Clearing',
+                                     'Clear the cached threads and summaries? The next digests will fetch and summarize again.',
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                     QMessageBox.StandardButton.No)
+
+        if reply == QMessageBox.StandardButton.Yes:
+            clear_thread_cache()
+            clear_summary_cache()
+
 class PreferencesDialog(QDialog):
+    # Emitted from the model catalog's refresh thread; Qt delivers it on the GUI thread
+    models_refreshed = pyqtSignal(str, list)
+
     def __init__(self, current_preferences, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Preferences")
         self.setGeometry(200, 200, 400, 200)
         self.current_preferences = current_preferences.copy() # Work with a copy
+        self.models_refreshed.connect(self.on_models_refreshed)
 
         self.init_ui()
 
     def init_ui(self):
         layout = QFormLayout()
 
+        # Model lists come from the local catalog; stale ones are refreshed in the background
         # OpenAI Default Model
-        self.openai_models = get_available_openai_models()
         self.openai_default_combo = QComboBox()
-        self.openai_default_combo.addItems(["None"] + self.openai_models)
-        default_openai = self.current_preferences.get('openai_default_model')
-        if default_openai and default_openai in self.openai_models:
-            self.openai_default_combo.setCurrentText(default_openai)
-        else:
-            self.openai_default_combo.setCurrentText("gpt-4.1-nano" if "gpt-4.1-nano" in self.openai_models else "None")
+        self.fill_model_combo(self.openai_default_combo, get_cached_openai_models(self.models_refreshed.emit),
+                              self.current_preferences.get('openai_default_model'), "gpt-4.1-nano")
         layout.addRow("Default OpenAI Model:", self.openai_default_combo)
 
         # Google Gemini Default Model
-        self.gemini_models = get_available_gemini_models()
         self.gemini_default_combo = QComboBox()
-        self.gemini_default_combo.addItems(["None"] + self.gemini_models)
-        default_gemini = self.current_preferences.get('gemini_default_model')
-        if default_gemini and default_gemini in self.gemini_models:
-            self.gemini_default_combo.setCurrentText(default_gemini)
-        else:
-            self.gemini_default_combo.setCurrentText("gemini-2.5-flash" if "gemini-2.5-flash" in self.gemini_models else "None")
+        self.fill_model_combo(self.gemini_default_combo, get_cached_gemini_models(self.models_refreshed.emit),
+                              self.current_preferences.get('gemini_default_model'), "gemini-2.5-flash")
         layout.addRow("Default Gemini Model:", self.gemini_default_combo)
 
+        # Explicit refresh of the model lists
+        self.refresh_models_button = QPushButton("Refresh Now")
+        self.refresh_models_button.clicked.connect(self.refresh_models)
+        self.refresh_status_label = QLabel("")
+        refresh_layout = QHBoxLayout()
+        refresh_layout.addWidget(self.refresh_models_button)
+        refresh_layout.addWidget(self.refresh_status_label)
+        layout.addRow("Model Lists:", refresh_layout)
+
         # Buttons
         button_layout = QHBoxLayout()
         save_button = QPushButton("Save")
@@ -310,6 +424,135 @@ class PreferencesDialog(QDialog):
 
         self.setLayout(layout)
 
+    def fill_model_combo(self, combo, models, selected_model, default_model):
+        combo.clear()
+        combo.addItems(["None"] + models)
+        if selected_model and selected_model in models:
+            combo.setCurrentText(selected_model)
+        else:
+            combo.setCurrentText(default_model if default_model in models else "None")
+
+    def refresh_models(self):
+        self.refresh_status_label.setText("Refreshing in the background...")
+        get_cached_openai_models(self.models_refreshed.emit, force_refresh=True)
+        get_cached_gemini_models(self.models_refreshed.emit, force_refresh=True)
+
+    def on_models_refreshed(self, provider, models):
+        if provider == "openai":
+            combo, key, default_model = self.openai_default_combo, 'openai_default_model', "gpt-4.1-nano"
+        elif provider == "gemini":
+            combo, key, default_model = self.gemini_default_combo, 'gemini_default_model', "gemini-2.5-flash"
+        else:
+            return
+        # A saved model missing from the earlier list left the combo on the fallback: select the saved one again.
+        # Otherwise keep whatever the user has picked in the meantime.
+        saved_model = self.current_preferences.get(key)
+        selected_model = saved_model if saved_model and combo.findText(saved_model) < 0 else combo.currentText()
+        self.fill_model_combo(combo, models, selected_model, default_model)
+        self.refresh_status_label.setText("Model lists updated.")
+
+    def get_preferences(self):
+        """Returns the preferences with the selected default models."""
+        preferences = self.current_preferences.copy()
+        for key, combo in (('openai_default_model', self.openai_default_combo), ('gemini_default_model', self.gemini_default_combo)):
+            if combo.currentText() == "None":
+                preferences.pop(key, None)
+            else:
+                preferences[key] = combo.currentText()
+        return preferences
+
+class HistoryListModel(QAbstractListModel):
+    """Lists history entries page by page; digest bodies are never held by the model."""
+
+    PAGE_SIZE = 200
+    EntryIdRole = Qt.ItemDataRole.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []
+        self.has_more = True
+        self.search_query = ""
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.entries):
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            # Use the title if available, otherwise fallback to URL; rows are rendered as HTML
+            display_text = html.escape(f"{entry['timestamp']} - {entry.get('title') or entry['url']} ({entry['method']})")
+            if 'snippet' in entry: # Search result: add the highlighted match below
+                display_text += f"<br><small>{entry['snippet']}</small>"
+            return display_text
+        if role == self.EntryIdRole:
+            return entry['id']
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.search_query:
+            # Ranked search results come in a single page
+            page = search_digest_history(self.search_query, self.PAGE_SIZE, as_html=True)
+            self.has_more = False
+        else:
+            before_id = self.entries[-1]['id'] if self.entries else None
+            page = load_digest_history_page(before_id, self.PAGE_SIZE)
+            self.has_more = len(page) == self.PAGE_SIZE
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.entries), len(self.entries) + len(page) - 1)
+            self.entries.extend(page)
+            self.endInsertRows()
+
+    def remove_row(self, row):
+        """Deletes one entry from the history and from the model, without reloading the list."""
+        if not 0 <= row < len(self.entries):
+            return
+        delete_digest_from_history(self.entries[row]['id'])
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.entries[row]
+        self.endRemoveRows()
+
+    def set_search_query(self, query):
+        """Switches between ranked search results and the full, paged history."""
+        self.search_query = query.strip()
+        self.reload()
+
+    def reload(self):
+        self.beginResetModel()
+        self.entries = []
+        self.has_more = True
+        self.endResetModel()
+
+class HtmlItemDelegate(QStyledItemDelegate):
+    """Renders the HTML returned by HistoryListModel, e.g. highlighted search snippets."""
+
+    def paint(self, painter, option, index):
+        self.initStyleOption(option, index)
+        document = QTextDocument()
+        document.setHtml(option.text)
+        option.text = ""
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+        # Draw the text in the theme's colors rather than the document's default black
+        context = QAbstractTextDocumentLayout.PaintContext()
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        context.palette.setColor(QPalette.ColorRole.Text, option.palette.highlightedText().color() if selected else option.palette.text().color())
+        painter.save()
+        painter.translate(option.rect.topLeft())
+        painter.setClipRect(option.rect.translated(-option.rect.topLeft()))
+        document.documentLayout().draw(painter, context)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        self.initStyleOption(option, index)
+        document = QTextDocument()
+        document.setHtml(option.text)
+        return QSize(int(document.idealWidth()), int(document.size().height()))
+
 class HistoryDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -320,9 +563,23 @@ class HistoryDialog(QDialog):
     def init_ui(self):
         main_layout = QVBoxLayout()
         
-        self.history_list_widget = QListWidget()
-        self.history_list_widget.itemClicked.connect(self.display_selected_digest)
-        main_layout.addWidget(self.history_list_widget)
+        # Full-text search; the query runs shortly after the user stops typing
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search titles, URLs and digests...")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        main_layout.addWidget(self.search_input)
+
+        self.history_model = HistoryListModel(self)
+        self.history_list_view = QListView()
+        self.history_list_view.setUniformItemSizes(True) # Lets the view skip measuring every row
+        self.history_list_view.setItemDelegate(HtmlItemDelegate(self.history_list_view))
+        self.history_list_view.setModel(self.history_model)
+        self.history_list_view.selectionModel().currentChanged.connect(self.display_selected_digest)
+        main_layout.addWidget(self.history_list_view)
 
         self.digest_display = QTextEdit()
         self.digest_display.setReadOnly(True)
@@ -330,17 +587,19 @@ class HistoryDialog(QDialog):
 
         self.copy_history_output_button = QPushButton("Copy Output")
         self.copy_history_output_button.clicked.connect(self.copy_history_digest_output)
+
+        self.delete_history_button = QPushButton("Delete")
+        self.delete_history_button.clicked.connect(self.delete_history_entry)
         
         self.delete_all_history_button = QPushButton("Delete All")
         self.delete_all_history_button.clicked.connect(self.delete_all_history_entries)
 
         history_buttons_layout = QHBoxLayout()
         history_buttons_layout.addWidget(self.copy_history_output_button)
+        history_buttons_layout.addWidget(self.delete_history_button)
         history_buttons_layout.addWidget(self.delete_all_history_button)
         main_layout.addLayout(history_buttons_layout)
 
-        self.load_history_entries()
-
         self.setLayout(main_layout)
 
     def copy_history_digest_output(self):
@@ -348,49 +607,31 @@ class HistoryDialog(QDialog):
         clipboard.setText(self.digest_display.toPlainText())
         QMessageBox.information(self, "Copy Success", "Digest content copied to clipboard!")
 
-    def load_history_entries(self):
-        self.history_list_widget.clear()
-        self.history_data = load_digest_history()
-        for entry in self.history_data:
-            list_item_widget = QWidget()
-            item_layout = QHBoxLayout()
-            item_layout.setContentsMargins(0, 0, 0, 0)
-            
-            # Use the title if available, otherwise fallback to URL
-            display_text = f"{entry['timestamp']} - {entry.get('title', entry['url'])} ({entry['method']})"
-            label = QLabel(display_text)
-            label.setWordWrap(True)
-            
-            delete_button = QPushButton("Delete")
-            delete_button.setFixedSize(80, 24)
-            # Use a lambda to pass the timestamp to the delete function
-            delete_button.clicked.connect(lambda _, ts=entry['timestamp']: self.delete_history_entry(ts))
-            
-            item_layout.addWidget(label, 1) # Give the label a stretch factor of 1
-            item_layout.addWidget(delete_button)
-            list_item_widget.setLayout(item_layout)
-            
-            list_item = QListWidgetItem(self.history_list_widget)
-            list_item.setSizeHint(list_item_widget.sizeHint())
-            self.history_list_widget.addItem(list_item)
-            self.history_list_widget.setItemWidget(list_item, list_item_widget)
-
-    def display_selected_digest(self, item):
-        index = self.history_list_widget.row(item)
-        if 0 <= index < len(self.history_data):
-            selected_entry = self.history_data[index]
-            self.digest_display.setText(selected_entry['digest_content'])
-
-    def delete_history_entry(self, timestamp):
+    def run_search(self):
+        self.history_model.set_search_query(self.search_input.text())
+        self.digest_display.clear()
+
+    def display_selected_digest(self, current, previous=None):
+        if not current.isValid():
+            self.digest_display.clear()
+            return
+        # Load the digest body only for the selected entry
+        entry_id = self.history_model.data(current, HistoryListModel.EntryIdRole)
+        self.digest_display.setText(get_digest_content(entry_id) or "")
+
+    def delete_history_entry(self):
+        current = self.history_list_view.currentIndex()
+        if not current.isValid():
+            return
+
         reply = QMessageBox.question(self, 'Confirm Deletion', 
                                      'Are you sure you want to delete this history entry?',
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, 
                                      QMessageBox.StandardButton.No)
 
         if reply == QMessageBox.StandardButton.Yes:
-            delete_digest_from_history(timestamp)
-            self.load_history_entries() # Refresh the list
-            self.digest_display.clear() # Clear the display
+            self.history_model.remove_row(current.row())
+            self.display_selected_digest(self.history_list_view.currentIndex())
 
     def delete_all_history_entries(self):
         reply = QMessageBox.question(self, 'Confirm Deletion', 
@@ -399,9 +640,8 @@ class HistoryDialog(QDialog):
                                      QMessageBox.StandardButton.No)
 
         if reply == QMessageBox.StandardButton.Yes:
-            from digest_history import clear_all_history
             clear_all_history()
-            self.load_history_entries() # Refresh the list
+            self.history_model.reload() # Refresh the list
             self.digest_display.clear() # Clear the display
 
 if __name__ == "__main__":
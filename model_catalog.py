@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Provider model lists, so dialogs can show them without waiting on the network
+MODEL_CATALOG_FILE = 'model_catalog.json'
+DEFAULT_TTL_SECONDS = 24 * 60 * 60 # Older lists are still used, but refreshed in the background
+
+_lock = threading.Lock() # Serializes reads and writes of the catalog file
+_refreshing = set() # Providers with a background refresh in flight
+
+def api_key_fingerprint(api_key):
+    """Identifies the API key a list was fetched with, without storing the key itself."""
+    return hashlib.sha256((api_key or "").encode('utf-8')).hexdigest()[:16]
+
+def _load_catalog():
+    if not os.path.exists(MODEL_CATALOG_FILE):
+        return {}
+    try:
+        with open(MODEL_CATALOG_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Warning: Could not read model catalog from {MODEL_CATALOG_FILE}: {e}. Ignoring it.")
+        return {}
+
+def _save_entry(provider, models, fingerprint):
+    with _lock:
+        catalog = _load_catalog()
+        catalog[provider] = {"models": models, "fetched_at": time.time(), "key_fingerprint": fingerprint}
+        temp_file = MODEL_CATALOG_FILE + '.tmp'
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(catalog, f, indent=4)
+            os.replace(temp_file, MODEL_CATALOG_FILE) # Readers never see a half-written file
+        except IOError as e:
+            print(f"Error saving model catalog to {MODEL_CATALOG_FILE}: {e}")
+
+def refresh_catalog_models(provider, fetch, fingerprint="", on_refreshed=None):
+    """Fetches a provider's model list now and stores it.
+
+    `fetch` returns the list or raises; on failure the previously cached list is kept
+    and None is returned. `on_refreshed(provider, models)` is called after a successful fetch.
+    """
+    try:
+        models = fetch()
+    except Exception as e:
+        print(f"Error refreshing {provider} model list: {e}. Keeping the cached list.")
+        return None
+    _save_entry(provider, models, fingerprint)
+    if on_refreshed:
+        try:
+            on_refreshed(provider, models)
+        except Exception as e: # E.g. the dialog that asked for the refresh has been closed
+            print(f"Error delivering refreshed {provider} model list: {e}")
+    return models
+
+def _refresh_in_background(provider, fetch, fingerprint, on_refreshed):
+    with _lock:
+        if provider in _refreshing:
+            return
+        _refreshing.add(provider)
+
+    def run():
+        try:
+            refresh_catalog_models(provider, fetch, fingerprint, on_refreshed)
+        finally:
+            with _lock:
+                _refreshing.discard(provider)
+
+    threading.Thread(target=run, name=f"model-catalog-{provider}", daemon=True).start()
+
+def get_catalog_models(provider, fetch, fingerprint="", fallback=None, ttl_seconds=DEFAULT_TTL_SECONDS,
+                       on_refreshed=None, force_refresh=False):
+    """Returns a provider's model list immediately, from the cache or `fallback` if nothing is cached.
+
+    Lists older than ttl_seconds, fetched with another API key, or when `force_refresh` is set
+    are refreshed on a background thread (stale-while-revalidate); `on_refreshed` then receives
+    the new list from that thread.
+    """
+    with _lock:
+        entry = _load_catalog().get(provider)
+    if entry is None:
+        _refresh_in_background(provider, fetch, fingerprint, on_refreshed)
+        return list(fallback or [])
+    if force_refresh or entry.get("key_fingerprint") != fingerprint or time.time() - entry.get("fetched_at", 0) > ttl_seconds:
+        _refresh_in_background(provider, fetch, fingerprint, on_refreshed)
+    return entry.get("models", [])
@@ -0,0 +1,16 @@
+# NumPy speeds up extractive summarization and near-duplicate detection; both work without it, more slowly.
+# It is imported on first use so that it does not slow down application startup.
+_numpy = None
+_numpy_missing = False
+
+def load_numpy():
+    """Imports NumPy on first use; returns None if it is not installed."""
+    global _numpy, _numpy_missing
+    if _numpy is None and not _numpy_missing:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy_missing = True
+            print("Warning: NumPy not found. Install with 'pip install numpy' for faster extractive summarization and deduplication.")
+    return _numpy
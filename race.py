@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Override these under "race" in model_preferences.json; a null model means the provider's default model
+RACE_DEFAULTS = {
+    "primary": {"provider": "openai", "model": None},
+    "secondary": {"provider": "gemini", "model": None},
+    "hedge_delay_seconds": 3.0 # How long the primary runs alone before the secondary is started
+}
+
+RACE_LOG_FILE = 'race_log.jsonl' # One line per race, read back by get_race_stats
+
+_log_lock = threading.Lock()
+
+def get_race_config(preferences=None, hedge_delay_seconds=None):
+    """Merges the defaults with preference overrides and an explicit hedge delay."""
+    config = dict(RACE_DEFAULTS)
+    config.update((preferences or {}).get("race", {}))
+    if hedge_delay_seconds is not None:
+        config["hedge_delay_seconds"] = hedge_delay_seconds
+    return config
+
+async def race(primary, secondary, hedge_delay_seconds, is_failure=lambda result: False):
+    """Runs `primary` and, unless it finishes within the hedge delay, `secondary`, returning the first good result.
+
+    Each racer is a (label, coroutine function) pair. A racer whose result `is_failure` accepts
+    does not win; if the primary fails before the hedge delay the secondary starts at once.
+    The loser is cancelled. Returns (result, outcome), where outcome records the winner,
+    whether the secondary was started, and each racer's latency and status: "won", "lost"
+    (finished with a good result after the winner), "failed" or "cancelled" (latency so far).
+    """
+    started = time.perf_counter()
+    labels = {}
+    outcome = {"primary": primary[0], "secondary": secondary[0], "hedge_delay_seconds": hedge_delay_seconds,
+               "hedged": False, "winner": None, "racers": {}}
+    racers = outcome["racers"]
+
+    def start(racer):
+        task = asyncio.ensure_future(racer[1]())
+        labels[task] = racer[0]
+        racers[racer[0]] = {"started_at": time.perf_counter() - started}
+        return task
+
+    def finish(task, status):
+        racer = racers[labels[task]]
+        racer["seconds"] = time.perf_counter() - started - racer["started_at"]
+        racer["status"] = status
+
+    def finished_status(task):
+        # Status of a racer that completed but was not looked at, e.g. done together with the winner
+        if task.cancelled():
+            return "cancelled"
+        if task.exception() is not None or task.result() is None or is_failure(task.result()):
+            return "failed"
+        return "lost"
+
+    primary_task = start(primary)
+    pending = {primary_task}
+    done, _ = await asyncio.wait(pending, timeout=hedge_delay_seconds)
+    results = {}
+    try:
+        while True:
+            pending -= done
+            for task in done:
+                try:
+                    result = task.result()
+                except Exception as e:
+                    print(f"Error in race entry {labels[task]}: {e}")
+                    result = None
+                results[labels[task]] = result
+                if result is not None and not is_failure(result):
+                    finish(task, "won")
+                    outcome["winner"] = labels[task]
+                    for other in done:
+                        if other is not task and "status" not in racers[labels[other]]:
+                            finish(other, finished_status(other))
+                    return result, outcome
+                finish(task, "failed")
+
+            if not outcome["hedged"]:
+                # Hedge delay passed or the primary failed early: start the secondary
+                outcome["hedged"] = True
+                pending.add(start(secondary))
+            if not pending:
+                # Both failed: report the primary's answer, which carries its error message
+                return results.get(primary[0]) or results.get(secondary[0]), outcome
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in pending:
+            task.cancel()
+            finish(task, "cancelled")
+        outcome["seconds"] = time.perf_counter() - started
+
+def record_race(outcome, log_file=None):
+    """Appends a race outcome to the race log."""
+    entry = dict(outcome, timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    try:
+        with _log_lock, open(log_file or RACE_LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except IOError as e:
+        print(f"Error writing race log {log_file or RACE_LOG_FILE}: {e}")
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def get_race_stats(log_file=None):
+    """Summarizes the race log: wins, hedge rate and latency percentiles per racer.
+
+    Racer latencies count every run that finished with a result (won or lost) and every
+    cancelled run, whose time until cancellation is a lower bound on its latency. Leaving
+    the cancelled runs out would hide the slow runs the hedge exists for; with them, the
+    percentiles are lower bounds when "censored" is nonzero. Failed runs are left out. A
+    hedge delay near the primary's p90-p95 hedges only the slow tail.
+    """
+    log_file = log_file or RACE_LOG_FILE
+    entries = []
+    if os.path.exists(log_file):
+        with open(log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+
+    latencies = {}
+    censored = {}
+    wins = {}
+    for entry in entries:
+        if entry.get("winner"):
+            wins[entry["winner"]] = wins.get(entry["winner"], 0) + 1
+        for label, racer in entry.get("racers", {}).items():
+            if racer.get("status") in ("won", "lost", "cancelled") and "seconds" in racer:
+                latencies.setdefault(label, []).append(racer["seconds"])
+                if racer["status"] == "cancelled":
+                    censored[label] = censored.get(label, 0) + 1
+
+    total_latencies = sorted(entry["seconds"] for entry in entries if "seconds" in entry)
+    stats = {
+        "races": len(entries),
+        "hedged": sum(1 for entry in entries if entry.get("hedged")),
+        "wins": wins,
+        "latency": {"race": {"p50": _percentile(total_latencies, 0.5), "p90": _percentile(total_latencies, 0.9), "p99": _percentile(total_latencies, 0.99)}}
+    }
+    for label, values in latencies.items():
+        values.sort()
+        stats["latency"][label] = {"count": len(values), "censored": censored.get(label, 0), "p50": _percentile(values, 0.5), "p90": _percentile(values, 0.9),
+                                   "p95": _percentile(values, 0.95), "p99": _percentile(values, 0.99)}
+    return stats
+
+if __name__ == "__main__":
+    print(json.dumps(get_race_stats(sys.argv[1] if len(sys.argv) > 1 else None), indent=4))
@@ -0,0 +1,260 @@
+import asyncio
+import email.utils
+import random
+import re
+import threading
+import time
+
+# Per-provider budgets; override them under "rate_limits" in model_preferences.json to match your account tier, e.g.
+# "rate_limits": {"openai": {"requests_per_minute": 5000, "tokens_per_minute": 2000000}}
+RATE_LIMIT_DEFAULTS = {
+    "reddit": {"requests_per_minute": 100}, # Reddit's OAuth quota per client id
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 200000},
+    "gemini": {"requests_per_minute": 60, "tokens_per_minute": 1000000},
+    "retry": {
+        "max_retries": 4, # Attempts after the first one, for retryable errors only
+        "backoff_base_seconds": 1.0,
+        "backoff_max_seconds": 60.0
+    }
+}
+
+# HTTP statuses worth retrying: timeouts, rate limits and transient server errors
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# Exception class names of the provider SDKs that mean a transient network or server problem
+_RETRYABLE_ERROR_NAMES = frozenset({
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError", # openai
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "TooManyRequests", # google.api_core
+    "RequestException", "ServerError" # prawcore
+})
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to `capacity`; reservations may go into debt so waiters queue in order."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.available = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def reserve(self, amount, now):
+        """Takes `amount` units and returns how many seconds the caller must wait before using them."""
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+        self.available -= min(amount, self.capacity) # A single request never waits for more than a full bucket
+        return max(0.0, -self.available / self.rate)
+
+class ProviderLimiter:
+    """Request and token budgets of one provider, shared by every thread and event loop of the process."""
+
+    def __init__(self, provider, requests_per_minute=None, tokens_per_minute=None):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._blocked_until = 0.0 # Set from Retry-After: nobody sends before this time
+        self.stats = {"requests": 0, "queue_depth": 0, "max_queue_depth": 0, "throttled": 0, "throttle_seconds": 0.0,
+                      "rate_limited": 0, "retries": 0}
+
+    def _reserve(self, tokens):
+        now = time.monotonic()
+        with self._lock:
+            self.stats["requests"] += 1
+            wait = self._blocked_until - now
+            if self._requests:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens and tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            if wait > 0:
+                self.stats["queue_depth"] += 1
+                self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.stats["queue_depth"])
+            return wait
+
+    def _remaining_block(self):
+        with self._lock:
+            return self._blocked_until - time.monotonic()
+
+    def _done_waiting(self, waited):
+        with self._lock:
+            self.stats["queue_depth"] -= 1
+            self.stats["throttled"] += 1
+            self.stats["throttle_seconds"] += waited
+
+    def acquire(self, tokens=0):
+        """Blocks until a request costing `tokens` fits the budgets; returns the seconds waited."""
+        wait = self._reserve(tokens)
+        if wait <= 0:
+            return 0.0
+        waited = 0.0
+        while wait > 0: # A Retry-After received meanwhile extends the wait
+            time.sleep(wait)
+            waited += wait
+            wait = self._remaining_block()
+        self._done_waiting(waited)
+        return waited
+
+    async def acquire_async(self, tokens=0):
+        """Async counterpart of acquire: waits without blocking the event loop."""
+        wait = self._reserve(tokens)
+        if wait <= 0:
+            return 0.0
+        waited = 0.0
+        while wait > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+            wait = self._remaining_block()
+        self._done_waiting(waited)
+        return waited
+
+    def block_for(self, seconds):
+        """Holds back every request to this provider for `seconds`, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def record_retry(self, rate_limited):
+        with self._lock:
+            self.stats["retries"] += 1
+            if rate_limited:
+                self.stats["rate_limited"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["blocked_seconds"] = max(0.0, self._blocked_until - time.monotonic())
+        return stats
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+_limiters_configured = False
+_retry_config = dict(RATE_LIMIT_DEFAULTS["retry"])
+
+def _configure_rate_limits(preferences):
+    # Creates the provider limiters from the defaults and the "rate_limits" preferences; called with _limiters_lock held
+    global _retry_config, _limiters_configured
+    overrides = (preferences or {}).get("rate_limits", {})
+    _limiters.clear()
+    for provider, defaults in RATE_LIMIT_DEFAULTS.items():
+        config = dict(defaults)
+        config.update(overrides.get(provider, {}))
+        if provider == "retry":
+            _retry_config = config
+        else:
+            _limiters[provider] = ProviderLimiter(provider, config.get("requests_per_minute"), config.get("tokens_per_minute"))
+    _limiters_configured = True
+
+def get_rate_limiter(provider):
+    """Returns the shared limiter of a provider ("reddit", "openai" or "gemini"), configured from the preferences on first use."""
+    with _limiters_lock:
+        if not _limiters_configured: # Concurrent first callers must all get the same limiters
+            from app_config import load_model_preferences
+            _configure_rate_limits(load_model_preferences())
+        return _limiters.setdefault(provider, ProviderLimiter(provider))
+
+def get_rate_limit_stats():
+    """Returns queue depth, throttling and retry counters per provider."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.provider: limiter.snapshot() for limiter in limiters}
+
+def _status_code(error):
+    for candidate in (getattr(error, "status_code", None), getattr(getattr(error, "response", None), "status_code", None), getattr(error, "code", None)):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+def is_rate_limit_error(error):
+    return _status_code(error) == 429 or type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+def is_retryable_error(error):
+    """True for rate limits, timeouts, connection problems and transient server errors; False for e.g. bad keys or requests."""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in _RETRYABLE_ERROR_NAMES
+
+def _parse_duration(value):
+    """Parses "20ms", "1s", "6m0s" (OpenAI reset headers) or a plain number of seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|s|m|h)', value)
+    if not parts:
+        return None
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+def retry_after_seconds(error):
+    """Returns how long the server asked us to wait, from Retry-After or rate-limit reset headers, or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        seconds = _parse_duration(retry_after)
+        if seconds is not None:
+            return seconds
+        try: # HTTP date form
+            return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    # OpenAI: x-ratelimit-reset-requests / -tokens; Reddit: x-ratelimit-reset (seconds)
+    resets = [_parse_duration(headers[name]) for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens", "x-ratelimit-reset") if headers.get(name)]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+def _retry_delay(error, attempt, limiter):
+    """Seconds to wait before retrying `error`, or None if it must not be retried."""
+    if getattr(error, "_rate_limit_handled", False): # A nested call (e.g. a MoreComments request within a fetch) already retried it
+        return None
+    if not is_retryable_error(error) or attempt >= _retry_config["max_retries"]:
+        error._rate_limit_handled = True
+        return None
+    limiter.record_retry(is_rate_limit_error(error))
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None:
+        limiter.block_for(retry_after) # Everyone queued for this provider waits, not just this caller
+        return retry_after
+    # Full jitter: spreads out retries from many digests failing at the same moment
+    return random.uniform(0, min(_retry_config["backoff_max_seconds"], _retry_config["backoff_base_seconds"] * 2 ** attempt))
+
+def run_with_rate_limit(provider, function, tokens=0):
+    """Calls `function()` within the provider's budgets, retrying retryable errors with backoff.
+
+    `tokens` is the estimated token cost of the request (prompt plus completion), 0 for Reddit.
+    Errors that are not retryable, or still failing after max_retries, are raised to the caller.
+    Each error is retried by the innermost call only, so nested calls do not multiply the retries.
+    """
+    limiter = get_rate_limiter(provider)
+    attempt = 0
+    while True:
+        limiter.acquire(tokens)
+        try:
+            return function()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, limiter)
+            if delay is None:
+                raise
+            print(f"Retrying {provider} request in {delay:.1f}s after: {e}")
+            time.sleep(delay)
+            attempt += 1
+
+async def run_with_rate_limit_async(provider, coroutine_function, tokens=0):
+    """Async counterpart of run_with_rate_limit; `coroutine_function()` is awaited for each attempt."""
+    limiter = get_rate_limiter(provider)
+    attempt = 0
+    while True:
+        await limiter.acquire_async(tokens)
+        try:
+            return await coroutine_function()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, limiter)
+            if delay is None:
+                raise
+            print(f"Retrying {provider} request in {delay:.1f}s after: {e}")
+            await asyncio.sleep(delay)
+            attempt += 1
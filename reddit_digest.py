@@ -1,174 +1,366 @@
 import praw
+import prawcore
 import re
-import configparser
-import os
+import asyncio
+import atexit
+import importlib.util
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, asynccontextmanager
 from urllib.parse import urlparse
 import html
-import json
 from datetime import datetime
-from dotenv import load_dotenv
-
-load_dotenv() # Load environment variables from .env file
-
-# Define the path for the preferences file
-PREFERENCES_FILE = 'model_preferences.json'
-
-# Try to import OpenAI and Google Generative AI libraries
-try:
-    import openai
-except ImportError:
-    openai = None
-    print("Warning: OpenAI library not found. Install with 'pip install openai' to use OpenAI summarization.")
-
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-    print("Warning: Google Generative AI library not found. Install with 'pip install google-generativeai' to use Gemini summarization.")
+from summary_cache import make_summary_cache_key, get_cached_summary, put_cached_summary
+from summary_template import build_summary_template
+import thread_cache
+# Configuration is shared with the GUI; these names are re-exported for existing callers
+from app_config import PREFERENCES_FILE, load_model_preferences, save_model_preferences, load_api_keys
+from model_catalog import get_catalog_models, api_key_fingerprint
+from comment_expansion import get_expansion_config, flatten_comment_forest, flatten_comment_forest_async, format_comment_for_prompt
+from comment_ranking import get_ranking_config, top_k_comments, comment_priorities
+from dedup import get_dedup_config, fold_near_duplicates
+from extractive import get_presummary_config, presummarize_comments, summarize_extractive
+from race import get_race_config, race, record_race
+from incremental import get_incremental_config, fingerprint_comments, select_changed_comments
+from digest_history import get_latest_digest_state
+from rate_limiter import run_with_rate_limit, run_with_rate_limit_async, is_rate_limit_error
+from chunking import estimate_tokens, chunk_comments, apply_token_budget, get_chunking_config
+
+# Registry of warm PRAW clients, keyed by Reddit credential set
+_reddit_client_pool = {}
+_reddit_client_pool_lock = threading.Lock()
+_reddit_fetch_stats = {
+    "cold": {"count": 0, "total_seconds": 0.0},
+    "warm": {"count": 0, "total_seconds": 0.0}
+}
+
+# Provider SDKs are imported on first use: google.generativeai alone pulls in grpc and protobuf
+openai = None
+genai = None
+_provider_import_lock = threading.Lock()
+_missing_providers = set()
+
+def _load_openai():
+    """Imports the OpenAI library on first use; returns None if it is not installed."""
+    global openai
+    with _provider_import_lock:
+        if openai is None and "openai" not in _missing_providers:
+            try:
+                import openai as openai_module
+                openai = openai_module
+            except ImportError:
+                _missing_providers.add("openai")
+                print("Warning: OpenAI library not found. Install with 'pip install openai' to use OpenAI summarization.")
+    return openai
+
+def _load_genai():
+    """Imports the Google Generative AI library on first use; returns None if it is not installed."""
+    global genai
+    with _provider_import_lock:
+        if genai is None and "gemini" not in _missing_providers:
+            try:
+                import google.generativeai as genai_module
+                genai = genai_module
+            except ImportError:
+                _missing_providers.add("gemini")
+                print("Warning: Google Generative AI library not found. Install with 'pip install google-generativeai' to use Gemini summarization.")
+    return genai
+
+asyncpraw = None
+asyncprawcore = None
+
+def _load_asyncpraw():
+    """Imports Async PRAW on first use; returns None if it is not installed."""
+    global asyncpraw, asyncprawcore
+    with _provider_import_lock:
+        if asyncpraw is None and "asyncpraw" not in _missing_providers:
+            try:
+                import asyncpraw as asyncpraw_module
+                import asyncprawcore as asyncprawcore_module
+                asyncpraw, asyncprawcore = asyncpraw_module, asyncprawcore_module
+            except ImportError:
+                _missing_providers.add("asyncpraw")
+                print("Warning: Async PRAW not found. Install with 'pip install asyncpraw' to fetch Reddit threads without a worker thread each.")
+    return asyncpraw
+
+def _is_installed(module_name):
+    """Checks that a library is installed without importing it."""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ImportError: # A missing parent package, e.g. no "google" namespace at all
+        return False
+
+# Shown when a provider's model list cannot be fetched; each includes that provider's default model
+OPENAI_FALLBACK_MODELS = sorted(["gpt-4.1-nano", "gpt-3.5-turbo", "gpt-4", "gpt-4o"])
+GEMINI_FALLBACK_MODELS = sorted([
+    "gemini-2.5-flash", # Desired default
+    "gemini-1.0-pro",
+    "gemini-1.5-flash-latest",
+    "gemini-1.5-pro-latest",
+    "gemini-pro",
+    "gemini-pro-vision" # Supports text generation from images and text
+])
+
+def _list_openai_models(api_key):
+    """Fetches the OpenAI chat models; raises on API errors."""
+    _load_openai()
+    openai.api_key = api_key
+    models = openai.models.list()
+    # Filter for chat completion models and add "gpt-4.1-nano" if not already present
+    chat_models = [m.id for m in models.data if "gpt" in m.id and "instruct" not in m.id and "embedding" not in m.id]
+    if "gpt-4.1-nano" not in chat_models:
+        chat_models.append("gpt-4.1-nano")
+    chat_models.sort()
+    return chat_models
+
+def _list_gemini_models(api_key):
+    """Fetches the Gemini models that support generateContent; raises on API errors."""
+    _load_genai()
+    genai.configure(api_key=api_key)
+    # List all available models from the API
+    models = genai.list_models()
+
+    # Filter for models that support 'generateContent'
+    # Also, ensure we correctly parse the model name (e.g., "models/gemini-pro")
+    generative_models = {
+        m.name.split('/')[-1] for m in models
+        if 'generateContent' in m.supported_generation_methods
+    }
+    # Add "gemini-2.5-flash" if not already present
+    generative_models.add("gemini-2.5-flash")
+    return sorted(generative_models)
 
 def get_available_openai_models():
-    if not openai:
+    # Fetches available OpenAI models from the API or returns a fallback list.
+    if not _load_openai():
         return []
-    api_keys = load_api_keys()
-    api_key = api_keys.get('openai_api_key')
-    
-    # Always include the desired default model in the fallback list
-    fallback_models = ["gpt-4.1-nano", "gpt-3.5-turbo", "gpt-4", "gpt-4o"] 
-    fallback_models.sort() # Ensure consistent order
-
+    api_key = load_api_keys().get('openai_api_key')
     if not api_key or api_key == "YOUR_OPENAI_API_KEY":
-        return fallback_models
-
-    openai.api_key = api_key
+        return list(OPENAI_FALLBACK_MODELS)
     try:
-        models = openai.models.list()
-        # Filter for chat completion models and add "gpt-4.1-nano" if not already present
-        chat_models = [m.id for m in models.data if "gpt" in m.id and "instruct" not in m.id and "embedding" not in m.id]
-        if "gpt-4.1-nano" not in chat_models:
-            chat_models.append("gpt-4.1-nano")
-        chat_models.sort()
-        return chat_models
+        return _list_openai_models(api_key)
     except Exception as e:
         print(f"Error fetching OpenAI models: {e}")
-        return fallback_models
+        return list(OPENAI_FALLBACK_MODELS)
 
 def get_available_gemini_models():
     # Fetches available Gemini models from the API or returns a fallback list.
-    # Comprehensive fallback list of known generative models, including the desired default
-    fallback_models = [
-        "gemini-2.5-flash", # Desired default
-        "gemini-1.0-pro",
-        "gemini-1.5-flash-latest",
-        "gemini-1.5-pro-latest",
-        "gemini-pro",
-        "gemini-pro-vision" # Supports text generation from images and text
-    ]
-    fallback_models.sort()
-
-    if not genai:
+    if not _load_genai():
         return [] # Return empty list if library is not installed
-
-    api_keys = load_api_keys()
-    api_key = api_keys.get('google_gemini_api_key')
-
+    api_key = load_api_keys().get('google_gemini_api_key')
     # If no API key is provided, return the fallback list
     if not api_key or api_key == "YOUR_GOOGLE_GEMINI_API_KEY":
-        return fallback_models
-
+        return list(GEMINI_FALLBACK_MODELS)
     try:
-        genai.configure(api_key=api_key)
-        # List all available models from the API
-        models = genai.list_models()
-        
-        # Filter for models that support 'generateContent'
-        # Also, ensure we correctly parse the model name (e.g., "models/gemini-pro")
-        generative_models = [
-            m.name.split('/')[-1] for m in models 
-            if 'generateContent' in m.supported_generation_methods
-        ]
-        
-        # Remove duplicates and sort
-        generative_models = sorted(list(set(generative_models)))
-        
-        # Add "gemini-2.5-flash" if not already present
-        if "gemini-2.5-flash" not in generative_models:
-            generative_models.append("gemini-2.5-flash")
-        
-        generative_models = sorted(list(set(generative_models))) # Re-sort after adding
-        
-        return generative_models if generative_models else fallback_models
+        return _list_gemini_models(api_key)
     except Exception as e:
         print(f"Error fetching Gemini models: {e}. Returning fallback list.")
-        return fallback_models
+        return list(GEMINI_FALLBACK_MODELS)
+
+def get_cached_openai_models(on_refreshed=None, force_refresh=False):
+    """Like get_available_openai_models, but answers from the model catalog without waiting on the network.
+
+    Stale lists (or all lists, with `force_refresh`) are refreshed in the background and
+    passed to `on_refreshed(provider, models)` when the fetch completes.
+    """
+    if not _is_installed("openai"):
+        return []
+    api_key = load_api_keys().get('openai_api_key')
+    if not api_key or api_key == "YOUR_OPENAI_API_KEY":
+        return list(OPENAI_FALLBACK_MODELS)
+    return get_catalog_models("openai", lambda: _list_openai_models(api_key), api_key_fingerprint(api_key), OPENAI_FALLBACK_MODELS,
+                              on_refreshed=on_refreshed, force_refresh=force_refresh)
 
-def load_model_preferences():
-    """Loads model preferences from a JSON file."""
-    if os.path.exists(PREFERENCES_FILE):
+def get_cached_gemini_models(on_refreshed=None, force_refresh=False):
+    """Gemini counterpart of get_cached_openai_models."""
+    if not _is_installed("google.generativeai"):
+        return []
+    api_key = load_api_keys().get('google_gemini_api_key')
+    if not api_key or api_key == "YOUR_GOOGLE_GEMINI_API_KEY":
+        return list(GEMINI_FALLBACK_MODELS)
+    return get_catalog_models("gemini", lambda: _list_gemini_models(api_key), api_key_fingerprint(api_key), GEMINI_FALLBACK_MODELS,
+                              on_refreshed=on_refreshed, force_refresh=force_refresh)
+
+def _reddit_creds_key(reddit_creds):
+    """Builds a hashable registry key from a Reddit credential set."""
+    return tuple(reddit_creds.get(field) for field in ('client_id', 'client_secret', 'user_agent', 'username', 'password'))
+
+def _create_reddit_client(reddit_creds):
+    """Creates a new read-only PRAW client (cold path: new HTTP session and OAuth token)."""
+    reddit = praw.Reddit(
+        client_id=reddit_creds.get('client_id'),
+        client_secret=reddit_creds.get('client_secret'),
+        user_agent=reddit_creds.get('user_agent'),
+        username=reddit_creds.get('username'),
+        password=reddit_creds.get('password')
+    )
+    reddit.read_only = True # We are only reading data
+    return reddit
+
+@contextmanager
+def pooled_reddit_client(reddit_creds):
+    """Checks a Reddit client out of the registry for exclusive use by the calling thread.
+
+    Idle clients keep their keep-alive HTTP session and OAuth token between digests;
+    prawcore refreshes expired tokens on its own. A client whose token was rejected
+    is dropped instead of being returned, so the next checkout starts cold.
+    Yields a (client, is_warm) tuple.
+    """
+    key = _reddit_creds_key(reddit_creds)
+    with _reddit_client_pool_lock:
+        idle_clients = _reddit_client_pool.setdefault(key, [])
+        client = idle_clients.pop() if idle_clients else None
+
+    is_warm = client is not None
+    if client is None:
+        client = _create_reddit_client(reddit_creds)
+
+    keep_client = True
+    try:
+        yield client, is_warm
+    except (prawcore.exceptions.InvalidToken, prawcore.exceptions.OAuthException):
+        keep_client = False # Do not return a client with a rejected token to the pool
+        raise
+    finally:
+        if keep_client:
+            with _reddit_client_pool_lock:
+                _reddit_client_pool.setdefault(key, []).append(client)
+
+# Idle Async PRAW clients per event loop, since their HTTP sessions cannot move between loops
+_async_reddit_client_pool = weakref.WeakKeyDictionary()
+_async_reddit_pool_generation = 0 # Bumped when the pool is closed; clients checked out before that are closed on return
+
+def _create_async_reddit_client(reddit_creds):
+    """Creates a new read-only Async PRAW client for the running event loop."""
+    reddit = asyncpraw.Reddit(
+        client_id=reddit_creds.get('client_id'),
+        client_secret=reddit_creds.get('client_secret'),
+        user_agent=reddit_creds.get('user_agent'),
+        username=reddit_creds.get('username'),
+        password=reddit_creds.get('password')
+    )
+    reddit.read_only = True
+    return reddit
+
+@asynccontextmanager
+async def pooled_async_reddit_client(reddit_creds):
+    """Async PRAW counterpart of pooled_reddit_client, pooling clients per running event loop."""
+    key = _reddit_creds_key(reddit_creds)
+    loop = asyncio.get_running_loop()
+    with _reddit_client_pool_lock:
+        generation = _async_reddit_pool_generation
+        idle_clients = _async_reddit_client_pool.setdefault(loop, {}).setdefault(key, [])
+        client = idle_clients.pop() if idle_clients else None
+
+    is_warm = client is not None
+    if client is None:
+        client = _create_async_reddit_client(reddit_creds)
+
+    keep_client = True
+    try:
+        yield client, is_warm
+    except (asyncprawcore.exceptions.InvalidToken, asyncprawcore.exceptions.OAuthException):
+        keep_client = False # Do not return a client with a rejected token to the pool
+        await client.close()
+        raise
+    finally:
+        if keep_client:
+            with _reddit_client_pool_lock:
+                keep_client = generation == _async_reddit_pool_generation
+                if keep_client:
+                    idle_clients.append(client)
+            if not keep_client: # The pool was closed while this client was in use
+                await _close_async_reddit_clients([client])
+
+async def _close_async_reddit_clients(clients):
+    for client in clients:
         try:
-            with open(PREFERENCES_FILE, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Warning: Could not decode JSON from {PREFERENCES_FILE}. Returning empty preferences.")
-            return {}
-    return {}
-
-def save_model_preferences(preferences):
-    """Saves model preferences to a JSON file."""
+            await client.close()
+        except Exception as e:
+            print(f"Warning: Could not close an Async PRAW client: {e}")
+
+def close_async_reddit_clients(timeout=10.0):
+    """Closes the HTTP sessions of every idle Async PRAW client, each on the event loop it belongs to.
+
+    Clients in use at the time are closed when they are returned.
+    """
+    global _async_reddit_pool_generation
+    with _reddit_client_pool_lock:
+        _async_reddit_pool_generation += 1
+        pools = list(_async_reddit_client_pool.items())
+        _async_reddit_client_pool.clear()
     try:
-        with open(PREFERENCES_FILE, 'w') as f:
-            json.dump(preferences, f, indent=4)
-    except IOError as e:
-        print(f"Error saving preferences to {PREFERENCES_FILE}: {e}")
-
-def load_api_keys():
-    api_keys = {}
-
-    # Try to load API keys from environment variables first
-    api_keys['openai_api_key'] = os.getenv('OPENAI_API_KEY')
-    api_keys['google_gemini_api_key'] = os.getenv('GOOGLE_GEMINI_API_KEY')
-
-    # Load Reddit credentials from environment variables
-    reddit_client_id = os.getenv('REDDIT_CLIENT_ID')
-    reddit_client_secret = os.getenv('REDDIT_CLIENT_SECRET')
-    reddit_user_agent = os.getenv('REDDIT_USER_AGENT')
-    reddit_username = os.getenv('REDDIT_USERNAME')
-    reddit_password = os.getenv('REDDIT_PASSWORD')
-
-    # If not found in environment variables, try to load from praw.ini
-    config = configparser.ConfigParser()
-    config_path = os.path.join(os.path.dirname(__file__), 'praw.ini')
-    config.read(config_path)
-
-    if 'api_keys' in config:
-        if not api_keys['openai_api_key']:
-            api_keys['openai_api_key'] = config.get('api_keys', 'openai_api_key', fallback=None)
-        if not api_keys['google_gemini_api_key']:
-            api_keys['google_gemini_api_key'] = config.get('api_keys', 'google_gemini_api_key', fallback=None)
-    
-    # Load Reddit credentials from praw.ini if not found in environment variables
-    reddit_creds = {}
-    if 'default' in config:
-        if not reddit_client_id:
-            reddit_creds['client_id'] = config.get('default', 'client_id', fallback=None)
-        if not reddit_client_secret:
-            reddit_creds['client_secret'] = config.get('default', 'client_secret', fallback=None)
-        if not reddit_user_agent:
-            reddit_creds['user_agent'] = config.get('default', 'user_agent', fallback=None)
-        if not reddit_username:
-            reddit_creds['username'] = config.get('default', 'username', fallback=None)
-        if not reddit_password:
-            reddit_creds['password'] = config.get('default', 'password', fallback=None)
-
-    # Combine environment variables and praw.ini for Reddit credentials
-    api_keys['reddit_creds'] = {
-        'client_id': reddit_client_id or reddit_creds.get('client_id'),
-        'client_secret': reddit_client_secret or reddit_creds.get('client_secret'),
-        'user_agent': reddit_user_agent or reddit_creds.get('user_agent'),
-        'username': reddit_username or reddit_creds.get('username'),
-        'password': reddit_password or reddit_creds.get('password')
-    }
-
-    return api_keys
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    for loop, pool in pools:
+        clients = [client for clients in pool.values() for client in clients]
+        if not clients or loop.is_closed():
+            continue
+        if loop is running_loop:
+            loop.create_task(_close_async_reddit_clients(clients)) # Cannot block the loop we are running on
+        elif loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(_close_async_reddit_clients(clients), loop).result(timeout)
+            except Exception as e:
+                print(f"Warning: Could not close Async PRAW clients: {e}")
+        else:
+            loop.run_until_complete(_close_async_reddit_clients(clients))
+
+# Close aiohttp sessions cleanly at exit, while the digest event loop thread is still running
+atexit.register(close_async_reddit_clients)
+
+def _record_reddit_fetch(is_warm, seconds):
+    path = "warm" if is_warm else "cold"
+    with _reddit_client_pool_lock:
+        _reddit_fetch_stats[path]["count"] += 1
+        _reddit_fetch_stats[path]["total_seconds"] += seconds
+
+def get_reddit_client_stats():
+    """Returns fetch latency statistics, split between cold and warm clients."""
+    with _reddit_client_pool_lock:
+        stats = {
+            "pooled_clients": sum(len(clients) for clients in _reddit_client_pool.values()),
+            "pooled_async_clients": sum(len(clients) for pool in _async_reddit_client_pool.values() for clients in pool.values())
+        }
+        for path, values in _reddit_fetch_stats.items():
+            count = values["count"]
+            stats[path] = {
+                "count": count,
+                "total_seconds": values["total_seconds"],
+                "avg_seconds": values["total_seconds"] / count if count else None
+            }
+    return stats
+
+# Messages returned by get_reddit_digest instead of a digest when something went wrong
+# Methods whose digests are written by a model
+AI_SUMMARIZATION_METHODS = ("openai", "gemini", "race")
+
+DIGEST_ERROR_PREFIXES = (
+    "Invalid Reddit URL:",
+    "No top-level comments found",
+    "An error occurred while summarizing with OpenAI.",
+    "An error occurred while summarizing with Google Gemini.",
+    "An unexpected error occurred while fetching Reddit content or summarizing.",
+    "OpenAI library not installed.",
+    "OpenAI API key not configured",
+    "Google Generative AI library not installed.",
+    "Google Gemini API key not configured.",
+    "The model returned an empty response.",
+    "The race method takes its models from the \"race\" preferences"
+)
+
+# Pipeline stages reported by get_reddit_digest through its progress callback
+DIGEST_STAGES = ("fetching", "building_prompt", "summarizing")
+
+class DigestCancelled(Exception):
+    """Raised by get_reddit_digest when its cancel event is set between stages."""
+
+def is_error_digest(digest_content):
+    """Returns True if get_reddit_digest produced an error message rather than a digest."""
+    return not digest_content or digest_content.startswith(DIGEST_ERROR_PREFIXES)
 
 def validate_reddit_url(url):
     # Enhanced URL validation for Reddit URLs
@@ -221,300 +413,637 @@ def sanitize_input(text):
     sanitized = sanitized.replace('\x00', '')
     return sanitized
 
-def summarize_with_openai(comments, api_key, model_name, detail_level="standard", submission_data=None, enable_text_analysis=False):
-    if not openai:
-        return "OpenAI library not installed."
-    if not api_key or api_key == "YOUR_OPENAI_API_KEY":
-        return "OpenAI API key not configured in praw.ini."
-
-    openai.api_key = api_key
-    
-    comment_text = "\n".join(comments)
-    
-    # Define common parts of the template
-    base_template_part = """
-# Reddit Thread Summary: [Thread Title]
-
-## Key Information
-
-*   **Source:** [Link to thread]
-*   **Subreddit:** r/[Subreddit Name]
-*   **Publication Date:** [Original Post Date]
-*   **Activity:** [Number of Comments]
-*   **Summarization Method:** [OpenAI model name] ([Detail Level])
-
----
-
-## Summary
-
-[Write a 2-4 sentence paragraph here summarizing the main issue and the general conclusion of the discussion thread. What is the main takeaway?]
-"""
+def _format_prompt_comments(comments):
+    return [sanitize_input(format_comment_for_prompt(comment)) for comment in comments]
+
+def _build_snapshot(submission, expansion_config, comments):
+    return {
+        'id': submission.id,
+        'title': submission.title,
+        'subreddit': submission.subreddit.display_name,
+        'created_utc': submission.created_utc,
+        'num_comments': submission.num_comments,
+        'selftext': submission.selftext,
+        'link_url': submission.url,
+        'is_self': submission.is_self,
+        'expansion': expansion_config,
+        'comments': comments
+    }
 
-    central_issue_part = """
----
+def _finish_fetch(report, is_warm, fetch_started):
+    fetch_seconds = time.perf_counter() - fetch_started
+    _record_reddit_fetch(is_warm, fetch_seconds)
+    report['reddit_client'] = "warm" if is_warm else "cold"
+    report['fetch_seconds'] = fetch_seconds
+
+def fetch_thread_snapshot(submission_id, reddit_creds, expansion_config=None, report=None):
+    """Downloads a submission and its comments into a plain, cacheable snapshot dict."""
+    if report is None:
+        report = {}
+    if expansion_config is None:
+        expansion_config = get_expansion_config()
+
+    def fetch():
+        with pooled_reddit_client(reddit_creds) as (reddit, is_warm):
+            submission = reddit.submission(id=submission_id)
+            comments = flatten_comment_forest(submission, expansion_config)
+            return _build_snapshot(submission, expansion_config, comments), is_warm
+
+    # The scheduler counts the submission request; MoreComments requests are counted by the expansion
+    fetch_started = time.perf_counter()
+    snapshot, is_warm = run_with_rate_limit("reddit", fetch)
+    _finish_fetch(report, is_warm, fetch_started)
+    return snapshot
+
+async def fetch_thread_snapshot_async(submission_id, reddit_creds, expansion_config=None, report=None):
+    """Async counterpart of fetch_thread_snapshot.
+
+    Uses Async PRAW when it is installed; otherwise the synchronous fetch runs on a worker thread.
+    """
+    if report is None:
+        report = {}
+    if expansion_config is None:
+        expansion_config = get_expansion_config()
+    if not _load_asyncpraw():
+        return await asyncio.to_thread(fetch_thread_snapshot, submission_id, reddit_creds, expansion_config, report)
+
+    async def fetch():
+        async with pooled_async_reddit_client(reddit_creds) as (reddit, is_warm):
+            submission = await reddit.submission(id=submission_id)
+            comments = await flatten_comment_forest_async(submission, expansion_config)
+            return _build_snapshot(submission, expansion_config, comments), is_warm
+
+    fetch_started = time.perf_counter()
+    snapshot, is_warm = await run_with_rate_limit_async("reddit", fetch)
+    _finish_fetch(report, is_warm, fetch_started)
+    return snapshot
+
+# Subreddit listings a watch can follow; only "top" and "controversial" take a time filter
+SUBREDDIT_LISTINGS = ("hot", "new", "rising", "top", "controversial")
+
+def fetch_subreddit_listing(subreddit_name, reddit_creds, listing="hot", time_filter="day", limit=25):
+    """Returns the submissions of a subreddit listing as plain dicts with id, url, title, subreddit, num_comments and created_utc."""
+    if listing not in SUBREDDIT_LISTINGS:
+        raise ValueError(f"Unknown listing '{listing}', expected one of {', '.join(SUBREDDIT_LISTINGS)}")
+
+    def fetch():
+        with pooled_reddit_client(reddit_creds) as (reddit, _):
+            subreddit = reddit.subreddit(subreddit_name)
+            if listing in ("top", "controversial"):
+                submissions = getattr(subreddit, listing)(time_filter=time_filter, limit=limit)
+            else:
+                submissions = getattr(subreddit, listing)(limit=limit)
+            return [{
+                'id': submission.id,
+                'url': f"https://www.reddit.com{submission.permalink}",
+                'title': submission.title,
+                'subreddit': submission.subreddit.display_name,
+                'num_comments': submission.num_comments,
+                'created_utc': submission.created_utc
+            } for submission in submissions]
+
+    # Counted as one request: Reddit returns up to 100 submissions per listing page
+    return run_with_rate_limit("reddit", fetch)
+
+def _load_cached_snapshot(submission_id, ttl_seconds, expansion_config, report):
+    snapshot = thread_cache.load_thread_snapshot(submission_id, ttl_seconds)
+    # A snapshot taken with other expansion limits holds a different set of comments
+    if snapshot is not None and snapshot.get('expansion') == expansion_config:
+        report['thread_cache'] = "hit"
+        return snapshot
+    return None
+
+def get_thread_snapshot(submission_id, reddit_creds, force_refresh=False, ttl_seconds=None, report=None, expansion_config=None):
+    """Returns a thread snapshot from the local thread cache, fetching it from Reddit when stale or forced."""
+    if report is None:
+        report = {}
+    if ttl_seconds is None:
+        ttl_seconds = thread_cache.DEFAULT_TTL_SECONDS
+    if expansion_config is None:
+        expansion_config = get_expansion_config()
+
+    if not force_refresh:
+        snapshot = _load_cached_snapshot(submission_id, ttl_seconds, expansion_config, report)
+        if snapshot is not None:
+            return snapshot
+
+    snapshot = fetch_thread_snapshot(submission_id, reddit_creds, expansion_config, report)
+    thread_cache.save_thread_snapshot(submission_id, snapshot)
+    report['thread_cache'] = "refresh" if force_refresh else "miss"
+    return snapshot
+
+async def get_thread_snapshot_async(submission_id, reddit_creds, force_refresh=False, ttl_seconds=None, report=None, expansion_config=None):
+    """Async counterpart of get_thread_snapshot; cache reads and writes run on worker threads."""
+    if report is None:
+        report = {}
+    if ttl_seconds is None:
+        ttl_seconds = thread_cache.DEFAULT_TTL_SECONDS
+    if expansion_config is None:
+        expansion_config = get_expansion_config()
+
+    if not force_refresh:
+        snapshot = await asyncio.to_thread(_load_cached_snapshot, submission_id, ttl_seconds, expansion_config, report)
+        if snapshot is not None:
+            return snapshot
+
+    snapshot = await fetch_thread_snapshot_async(submission_id, reddit_creds, expansion_config, report)
+    await asyncio.to_thread(thread_cache.save_thread_snapshot, submission_id, snapshot)
+    report['thread_cache'] = "refresh" if force_refresh else "miss"
+    return snapshot
+
+def _record_first_token(report, started, chunks_so_far):
+    """Stores the time-to-first-token in the report when the first streamed chunk arrives."""
+    if not chunks_so_far and report is not None:
+        report['ttft_seconds'] = time.perf_counter() - started
+
+SUMMARY_SYSTEM_PROMPT = "You are a helpful assistant that summarizes Reddit comments into a structured report. If text analysis is enabled, also provide overall sentiment and key positive/negative aspects."
+
+# Prompt for the map step of map-reduce summarization, run once per comment batch
+MAP_PROMPT = """
+Summarize the following batch of Reddit comments as concise bullet notes.
+Keep the main points, consensus, suggested solutions, warnings, tools or products mentioned and points of disagreement.
+A comment starting with "(N similar comments)" stands for N near-identical comments; treat the count as a sign of agreement.
+Do not add a title or any introduction.
 
-## Central Issue
+Reddit Comments:
+{comment_text}
 
-[Clearly describe the problem, question, or initial topic raised by the Original Poster (OP).]
+Notes:
 """
+MAP_MAX_TOKENS = 600
+
+def build_thread_details(submission_data, model_name, detail_level):
+    """Returns the values of the template's Key Information fields for one thread."""
+    if not submission_data:
+        return f"Model name: {model_name}\nDetail Level: {detail_level}"
+    return "\n".join([
+        f"Thread Title: {sanitize_input(submission_data.get('title', 'N/A'))}",
+        f"Link to thread: {sanitize_input(submission_data.get('url', 'N/A'))}",
+        f"Subreddit Name: {sanitize_input(submission_data.get('subreddit', 'N/A'))}",
+        f"Original Post Date: {sanitize_input(submission_data.get('date', 'N/A'))}",
+        f"Number of Comments: {submission_data.get('num_comments', 'N/A')}",
+        f"Model name: {model_name}",
+        f"Detail Level: {detail_level}"
+    ])
+
+def build_summary_prompt(comment_text, template, thread_details=""):
+    # Instruction for the AI to fill the template. The instructions and template come first and are
+    # identical for every thread of a detail level, so providers can serve them from their prompt cache.
+    return f"""
+Please summarize the Reddit thread comments given after the template and fill in the provided template.
+Ensure you strictly adhere to the template structure and fill all bracketed fields `[ ]` with relevant information extracted from the comments.
+Fill the Key Information fields with the thread details given below, using the field names in brackets.
+If a section has no relevant information, you can leave its bullet points or descriptions empty, but keep the section headers.
+A comment starting with "(N similar comments)" stands for N near-identical comments; treat the count as a sign of agreement.
 
-    community_discussion_part = """
----
-
-## Community Discussion Analysis
-
-### General Consensus and Best Practices
-
-*   [Consensus Point 1]
-*   [Consensus Point 2]
-*   [Consensus Point 3]
-
-### Suggested Solutions and Methods
-
-*   **[Method 1]:** [Description of the method]
-*   **[Method 2]:** [Description of the method]
-*   **[Method 3]:** [Description of the method]
+Template to fill:
+{template}
 
-### Warnings and Cautionary Points
+Thread details:
+{thread_details}
 
-*   [Warning 1: Description of the risk or cautionary point]
-*   [Warning 2: Description of the risk or cautionary point]
-*   [Warning 3: Description of the risk or cautionary point]
+Reddit Comments:
+{comment_text}
 
-### Tools and Products Mentioned
+Summary:
+"""
 
-*   **[Tool/Product 1]:** [Brief description or context of mention]
-*   **[Tool/Product 2]:** [Brief description or context of mention]
+def build_update_prompt(comment_text, template, thread_details, previous_summary):
+    # Instruction for an incremental digest: revise the previous summary with the comments that changed since.
+    # Like build_summary_prompt, the fixed instructions and template come first.
+    return f"""
+Please update an existing summary of a Reddit thread. It fills in the template below, and was written before the new and edited comments given at the end.
+Return the complete updated summary: add what the new comments bring, revise points they change or contradict, and keep everything that is still valid.
+Ensure you strictly adhere to the template structure and fill all bracketed fields `[ ]`, using the thread details given below for the Key Information fields.
+A comment starting with "(edited)" replaces an earlier version of it that the summary may reflect.
+A comment starting with "(reply to: ...)" answers the quoted comment.
+A comment starting with "(N similar comments)" stands for N near-identical comments; treat the count as a sign of agreement.
 
-### Points of Debate and Divergent Opinions
+Template to fill:
+{template}
 
-*   **[Debate Topic 1]:** [Description of different viewpoints]
-*   **[Debate Topic 2]:** [Description of different viewpoints]
-"""
+Thread details:
+{thread_details}
 
-    report_conclusion_part = """
----
+Previous summary:
+{previous_summary}
 
-## Report Conclusion
+New and edited comments:
+{comment_text}
 
-[Summarize here the 3 or 4 most important takeaways from the discussion. What are the final recommendations?]
+Updated summary:
 """
 
-    sentiment_analysis_part = """
----
+def _final_prompt(comment_text, template, submission_data, model_name, detail_level, previous_summary):
+    thread_details = build_thread_details(submission_data, model_name, detail_level)
+    if previous_summary:
+        return build_update_prompt(comment_text, template, thread_details, previous_summary)
+    return build_summary_prompt(comment_text, template, thread_details)
+
+def _budget_comments(comments, provider, model_name, report, priorities):
+    """Drops comments beyond the provider's input budget; returns the rest, the chunking config and whether they fit one prompt."""
+    config = get_chunking_config(provider, model_name, load_model_preferences())
+    comments = apply_token_budget(comments, config['max_input_tokens'], priorities)
+    input_tokens = sum(estimate_tokens(comment) for comment in comments)
+    report['input_tokens'] = input_tokens
+    return comments, config, input_tokens <= config['single_pass_tokens']
+
+def _combine_batch_notes(partial_summaries):
+    # The reduce step fills the summary template from these notes
+    return "\n\n".join(
+        f"Notes from comment batch {index} of {len(partial_summaries)}:\n{partial_summary.strip()}"
+        for index, partial_summary in enumerate(partial_summaries, 1)
+    )
+
+def prepare_comment_text(comments, provider, model_name, complete, report=None, priorities=None):
+    """Turns comments into prompt text that fits the provider's token budget.
+
+    Comments beyond the overall input budget are dropped, lowest `priorities` first. If the rest is larger than a
+    single prompt allows, it is split into token-sized batches that are summarized in
+    parallel with `complete(prompt, max_tokens, batch_report)`, and the batch notes are returned instead.
+    Each batch reports its token usage into its own dict, merged into `report` on the calling thread.
+    """
+    if report is None:
+        report = {}
+    comments, config, fits_single_pass = _budget_comments(comments, provider, model_name, report, priorities)
+    if fits_single_pass:
+        return "\n".join(comments)
+
+    # Map: summarize each batch in parallel
+    batches = chunk_comments(comments, config['chunk_tokens'])
+    report['map_batches'] = len(batches)
+    batch_reports = [{} for _ in batches]
+    with ThreadPoolExecutor(max_workers=max(1, config['parallelism'])) as executor:
+        partial_summaries = list(executor.map(
+            lambda batch, batch_report: complete(MAP_PROMPT.format(comment_text="\n".join(batch)), MAP_MAX_TOKENS, batch_report),
+            batches, batch_reports
+        ))
+    _merge_prompt_cache(report, batch_reports)
+    return _combine_batch_notes(partial_summaries)
+
+async def prepare_comment_text_async(comments, provider, model_name, complete, report=None, priorities=None):
+    """Async counterpart of prepare_comment_text, where `complete` is a coroutine function.
+
+    Token counting runs on a worker thread; map batches are awaited concurrently, at most `parallelism` at a time.
+    """
+    if report is None:
+        report = {}
+    comments, config, fits_single_pass = await asyncio.to_thread(_budget_comments, comments, provider, model_name, report, priorities)
+    if fits_single_pass:
+        return "\n".join(comments)
+
+    batches = await asyncio.to_thread(chunk_comments, comments, config['chunk_tokens'])
+    report['map_batches'] = len(batches)
+    semaphore = asyncio.Semaphore(max(1, config['parallelism']))
+
+    batch_reports = [{} for _ in batches]
+
+    async def summarize_batch(batch, batch_report):
+        async with semaphore:
+            return await complete(MAP_PROMPT.format(comment_text="\n".join(batch)), MAP_MAX_TOKENS, batch_report)
+
+    partial_summaries = await asyncio.gather(*(summarize_batch(batch, batch_report) for batch, batch_report in zip(batches, batch_reports)))
+    _merge_prompt_cache(report, batch_reports)
+    return _combine_batch_notes(partial_summaries)
+
+def _record_prompt_cache(report, prompt_tokens, cached_tokens):
+    """Adds one response's prompt and cached-prefix token counts to the report."""
+    if report is None or prompt_tokens is None:
+        return
+    usage = report.setdefault('prompt_cache', {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0})
+    usage["requests"] += 1
+    usage["prompt_tokens"] += prompt_tokens
+    usage["cached_tokens"] += cached_tokens or 0
+
+def _merge_prompt_cache(report, batch_reports):
+    for batch_report in batch_reports:
+        batch_usage = batch_report.get('prompt_cache')
+        if batch_usage:
+            usage = report.setdefault('prompt_cache', {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            for name in usage:
+                usage[name] += batch_usage[name]
+
+def _record_openai_usage(report, usage):
+    # usage.prompt_tokens_details.cached_tokens: prompt prefix served from OpenAI's cache (prompts of 1024+ tokens)
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        _record_prompt_cache(report, usage.prompt_tokens, getattr(details, "cached_tokens", 0))
+
+def _record_gemini_usage(report, usage_metadata):
+    # cached_content_token_count: prompt prefix served from Gemini's implicit or explicit cache
+    if usage_metadata is not None:
+        _record_prompt_cache(report, getattr(usage_metadata, "prompt_token_count", None), getattr(usage_metadata, "cached_content_token_count", 0))
+
+def _request_tokens(prompt, max_tokens):
+    # Tokens a request counts against the provider's tokens-per-minute budget: prompt plus completion
+    return estimate_tokens(prompt) + (max_tokens or 0)
+
+def _openai_messages(prompt):
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
 
-## Sentiment Analysis
+# OpenAI clients per API key; unlike the module-level client, their settings do not leak into other callers
+_openai_clients = {}
+_openai_clients_lock = threading.Lock()
+
+def _get_openai_client(api_key):
+    with _openai_clients_lock:
+        if api_key not in _openai_clients:
+            # Retries are left to the rate limiter, which shares Retry-After waits across requests
+            _openai_clients[api_key] = openai.OpenAI(api_key=api_key, max_retries=0)
+        return _openai_clients[api_key]
+
+def _openai_complete(client, prompt, model_name, max_tokens, stream_callback=None, report=None):
+    """Runs one OpenAI chat completion and returns its text, streaming it when a callback is given."""
+    messages = _openai_messages(prompt)
+    request_tokens = _request_tokens(prompt, max_tokens)
+    if stream_callback is None:
+        response = run_with_rate_limit("openai", lambda: client.chat.completions.create(model=model_name, messages=messages, max_tokens=max_tokens), request_tokens)
+        _record_openai_usage(report, getattr(response, "usage", None))
+        return response.choices[0].message.content or ""
+
+    # Streaming: hand each text delta to the callback as it arrives; the last chunk carries the usage
+    started = time.perf_counter()
+    stream = run_with_rate_limit("openai", lambda: client.chat.completions.create(model=model_name, messages=messages, max_tokens=max_tokens, stream=True,
+                                                                                  stream_options={"include_usage": True}), request_tokens)
+    chunks = []
+    for chunk in stream:
+        _record_openai_usage(report, getattr(chunk, "usage", None))
+        text = chunk.choices[0].delta.content if chunk.choices else None
+        if text:
+            _record_first_token(report, started, chunks)
+            chunks.append(text)
+            stream_callback(text)
+    return "".join(chunks)
+
+# AsyncOpenAI clients per event loop and API key; their connection pools belong to one loop
+_async_openai_clients = weakref.WeakKeyDictionary()
+_async_openai_clients_lock = threading.Lock()
+
+def _get_async_openai_client(api_key):
+    loop = asyncio.get_running_loop()
+    with _async_openai_clients_lock:
+        clients = _async_openai_clients.setdefault(loop, {})
+        if api_key not in clients:
+            # Retries are left to the rate limiter, which shares Retry-After waits across requests
+            clients[api_key] = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+        return clients[api_key]
+
+async def _openai_complete_async(client, prompt, model_name, max_tokens, stream_callback=None, report=None):
+    """Async counterpart of _openai_complete, using an AsyncOpenAI client."""
+    messages = _openai_messages(prompt)
+    request_tokens = await asyncio.to_thread(_request_tokens, prompt, max_tokens) # Tokenizing a large prompt would stall the event loop
+    if stream_callback is None:
+        response = await run_with_rate_limit_async("openai", lambda: client.chat.completions.create(model=model_name, messages=messages, max_tokens=max_tokens), request_tokens)
+        _record_openai_usage(report, getattr(response, "usage", None))
+        return response.choices[0].message.content or ""
+
+    started = time.perf_counter()
+    stream = await run_with_rate_limit_async("openai", lambda: client.chat.completions.create(model=model_name, messages=messages, max_tokens=max_tokens, stream=True,
+                                                                                              stream_options={"include_usage": True}), request_tokens)
+    chunks = []
+    async for chunk in stream:
+        _record_openai_usage(report, getattr(chunk, "usage", None))
+        text = chunk.choices[0].delta.content if chunk.choices else None
+        if text:
+            _record_first_token(report, started, chunks)
+            chunks.append(text)
+            stream_callback(text)
+    return "".join(chunks)
+
+def _gemini_model(model_name):
+    # Ensure the model name is correctly formatted (e.g., "models/gemini-pro")
+    if not model_name.startswith("models/"):
+        model_name = f"models/{model_name}"
+    return genai.GenerativeModel(model_name)
+
+def _gemini_complete(prompt, model_name, max_tokens=None, stream_callback=None, report=None):
+    """Runs one Gemini generation and returns its text, streaming it when a callback is given."""
+    model = _gemini_model(model_name)
+    generation_config = {"max_output_tokens": max_tokens} if max_tokens else None
+    request_tokens = _request_tokens(prompt, max_tokens)
+    if stream_callback is None:
+        response = run_with_rate_limit("gemini", lambda: model.generate_content(prompt, generation_config=generation_config), request_tokens)
+        _record_gemini_usage(report, getattr(response, "usage_metadata", None))
+        return response.text
+
+    # Streaming: hand each text chunk to the callback as it arrives; the last chunk carries the full usage
+    started = time.perf_counter()
+    chunks = []
+    usage_metadata = None
+    stream = run_with_rate_limit("gemini", lambda: model.generate_content(prompt, generation_config=generation_config, stream=True), request_tokens)
+    for chunk in stream:
+        usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+        text = chunk.text
+        if text:
+            _record_first_token(report, started, chunks)
+            chunks.append(text)
+            stream_callback(text)
+    _record_gemini_usage(report, usage_metadata)
+    return "".join(chunks)
+
+async def _gemini_complete_async(prompt, model_name, max_tokens=None, stream_callback=None, report=None):
+    """Async counterpart of _gemini_complete, using generate_content_async."""
+    model = _gemini_model(model_name)
+    generation_config = {"max_output_tokens": max_tokens} if max_tokens else None
+    request_tokens = await asyncio.to_thread(_request_tokens, prompt, max_tokens)
+    if stream_callback is None:
+        response = await run_with_rate_limit_async("gemini", lambda: model.generate_content_async(prompt, generation_config=generation_config), request_tokens)
+        _record_gemini_usage(report, getattr(response, "usage_metadata", None))
+        return response.text
+
+    started = time.perf_counter()
+    chunks = []
+    usage_metadata = None
+    stream = await run_with_rate_limit_async("gemini", lambda: model.generate_content_async(prompt, generation_config=generation_config, stream=True), request_tokens)
+    async for chunk in stream:
+        usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+        text = chunk.text
+        if text:
+            _record_first_token(report, started, chunks)
+            chunks.append(text)
+            stream_callback(text)
+    _record_gemini_usage(report, usage_metadata)
+    return "".join(chunks)
+
+def _openai_setup_error(api_key):
+    """Returns the message to show instead of an OpenAI summary when it cannot run, or None."""
+    if not _load_openai():
+        return "OpenAI library not installed."
+    if not api_key or api_key == "YOUR_OPENAI_API_KEY":
+        return "OpenAI API key not configured in praw.ini."
+    return None
 
-*   **Overall Sentiment:** [Overall sentiment of the discussion (e.g., Positive, Negative, Neutral, Mixed)]
-*   **Key Positive Aspects:** [List 2-3 positive themes or points of view]
-*   **Key Negative Aspects:** [List 2-3 negative themes or points of view]
-"""
-    
-    # Construct templates dynamically based on detail_level
-    if detail_level == "concise":
-        selected_template = base_template_part
-        max_tokens_val = 500 # Adjusted for concise summary
-    elif detail_level == "standard":
-        selected_template = base_template_part + central_issue_part + report_conclusion_part
-        max_tokens_val = 1000 # Adjusted for standard summary
-    else: # Default to detailed
-        selected_template = base_template_part + central_issue_part + community_discussion_part + report_conclusion_part
-        max_tokens_val = 2000 # Adjusted for detailed summary
-
-    # Add sentiment analysis part if enabled
-    if enable_text_analysis:
-        selected_template += sentiment_analysis_part
-
-    # Fill in the Key Information section of the selected template
-    if submission_data:
-        selected_template = selected_template.replace("[Thread Title]", sanitize_input(submission_data.get('title', 'N/A')))
-        selected_template = selected_template.replace("[Link to thread]", sanitize_input(submission_data.get('url', 'N/A')))
-        selected_template = selected_template.replace("[Subreddit Name]", sanitize_input(submission_data.get('subreddit', 'N/A')))
-        selected_template = selected_template.replace("[Original Post Date]", sanitize_input(submission_data.get('date', 'N/A')))
-        selected_template = selected_template.replace("[Number of Comments]", str(submission_data.get('num_comments', 'N/A')))
-        selected_template = selected_template.replace("[OpenAI model name]", model_name)
-    
-    # Instruction for the AI to fill the template
-    prompt_instruction = f"""
-Please summarize the following Reddit thread comments and fill in the provided template.
-Ensure you strictly adhere to the template structure and fill all bracketed fields `[ ]` with relevant information extracted from the comments.
-If a section has no relevant information, you can leave its bullet points or descriptions empty, but keep the section headers.
+def _gemini_setup_error(api_key):
+    """Returns the message to show instead of a Gemini summary when it cannot run, or None."""
+    if not _load_genai():
+        return "Google Generative AI library not installed. Please run 'pip install google-generativeai'."
+    if not api_key or api_key == "YOUR_GOOGLE_GEMINI_API_KEY":
+        return "Google Gemini API key not configured. Please add it to your .env file or praw.ini."
+    return None
+
+def _openai_error(e):
+    print(f"Error summarizing with OpenAI: {e}")
+    if is_rate_limit_error(e):
+        return "An error occurred while summarizing with OpenAI. The API rate limit was still exceeded after retrying; please try again later."
+    return "An error occurred while summarizing with OpenAI. Please check your API key and try again."
+
+def _gemini_result(response_text):
+    # Check for empty or invalid response
+    if not response_text or not response_text.strip():
+        return "The model returned an empty response. Please try again."
+    return response_text.strip()
+
+def _gemini_error(e, model_name):
+    error_message = f"Error summarizing with Google Gemini: {e}"
+    print(f"{error_message} (Model: {model_name})")
+    if is_rate_limit_error(e):
+        return "An error occurred while summarizing with Google Gemini. The API quota was still exceeded after retrying; please try again later."
+    return "An error occurred while summarizing with Google Gemini. Please check your API key, the selected model, and try again."
+
+def summarize_with_openai(comments, api_key, model_name, detail_level="standard", submission_data=None, enable_text_analysis=False,
+                          stream_callback=None, report=None, comment_priorities=None, previous_summary=None):
+    # With `stream_callback`, the completion is streamed and each text chunk is passed to it as it arrives.
+    # `comment_priorities` (one rank per comment) decides which comments are dropped when over budget.
+    # With `previous_summary`, `comments` are the changes since it and the model updates it (see incremental.py).
+    setup_error = _openai_setup_error(api_key)
+    if setup_error:
+        return setup_error
+
+    client = _get_openai_client(api_key)
+    selected_template, max_tokens_val = build_summary_template(detail_level, enable_text_analysis)
 
-Reddit Comments:
-{comment_text}
+    try:
+        comment_text = prepare_comment_text(
+            comments, "openai", model_name,
+            lambda prompt, max_tokens, batch_report: _openai_complete(client, prompt, model_name, max_tokens, report=batch_report),
+            report, comment_priorities
+        )
+        prompt_instruction = _final_prompt(comment_text, selected_template, submission_data, model_name, detail_level, previous_summary)
+        return _openai_complete(client, prompt_instruction, model_name, max_tokens_val, stream_callback, report).strip()
+    except Exception as e:
+        return _openai_error(e)
 
-Template to fill:
-{selected_template}
+async def summarize_with_openai_async(comments, api_key, model_name, detail_level="standard", submission_data=None, enable_text_analysis=False,
+                                      stream_callback=None, report=None, comment_priorities=None, previous_summary=None):
+    # Async counterpart of summarize_with_openai, on an AsyncOpenAI client shared by the running event loop.
+    setup_error = _openai_setup_error(api_key)
+    if setup_error:
+        return setup_error
 
-Summary:
-"""
-    
-    # max_tokens_val is already set based on detail_level
+    client = _get_async_openai_client(api_key)
+    selected_template, max_tokens_val = build_summary_template(detail_level, enable_text_analysis)
 
     try:
-        response = openai.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that summarizes Reddit comments into a structured report. If text analysis is enabled, also provide overall sentiment and key positive/negative aspects."},
-                {"role": "user", "content": prompt_instruction}
-            ],
-            max_tokens=max_tokens_val
+        comment_text = await prepare_comment_text_async(
+            comments, "openai", model_name,
+            lambda prompt, max_tokens, batch_report: _openai_complete_async(client, prompt, model_name, max_tokens, report=batch_report),
+            report, comment_priorities
         )
-        return response.choices[0].message.content.strip()
+        prompt_instruction = _final_prompt(comment_text, selected_template, submission_data, model_name, detail_level, previous_summary)
+        return (await _openai_complete_async(client, prompt_instruction, model_name, max_tokens_val, stream_callback, report)).strip()
     except Exception as e:
-        print(f"Error summarizing with OpenAI: {e}")
-        return "An error occurred while summarizing with OpenAI. Please check your API key and try again."
+        return _openai_error(e)
 
-def summarize_with_gemini(comments, api_key, model_name, detail_level="standard", submission_data=None, enable_text_analysis=False):
+def summarize_with_gemini(comments, api_key, model_name, detail_level="standard", submission_data=None, enable_text_analysis=False,
+                          stream_callback=None, report=None, comment_priorities=None, previous_summary=None):
     # Summarizes comments using the Google Gemini API.
-    if not genai:
-        return "Google Generative AI library not installed. Please run 'pip install google-generativeai'."
-    
-    if not api_key or api_key == "YOUR_GOOGLE_GEMINI_API_KEY":
-        return "Google Gemini API key not configured. Please add it to your .env file or praw.ini."
+    # With `stream_callback`, the response is streamed and each text chunk is passed to it as it arrives.
+    # `comment_priorities` (one rank per comment) decides which comments are dropped when over budget.
+    # With `previous_summary`, `comments` are the changes since it and the model updates it (see incremental.py).
+    setup_error = _gemini_setup_error(api_key)
+    if setup_error:
+        return setup_error
 
     genai.configure(api_key=api_key)
-    
-    comment_text = "\n".join(comments)
-    
-    # Define common parts of the template
-    base_template_part = """
-# Reddit Thread Summary: [Thread Title]
-
-## Key Information
-
-*   **Source:** [Link to thread]
-*   **Subreddit:** r/[Subreddit Name]
-*   **Publication Date:** [Original Post Date]
-*   **Activity:** [Number of Comments]
-*   **Summarization Method:** [Google Gemini model name] ([Detail Level])
-
----
-
-## Summary
-
-[Write a 2-4 sentence paragraph here summarizing the main issue and the general conclusion of the discussion thread. What is the main takeaway?]
-"""
-
-    central_issue_part = """
----
-
-## Central Issue
-
-[Clearly describe the problem, question, or initial topic raised by the Original Poster (OP).]
-"""
-
-    community_discussion_part = """
----
-
-## Community Discussion Analysis
-
-### General Consensus and Best Practices
-
-*   [Consensus Point 1]
-*   [Consensus Point 2]
-*   [Consensus Point 3]
-
-### Suggested Solutions and Methods
-
-*   **[Method 1]:** [Description of the method]
-*   **[Method 2]:** [Description of the method]
-*   **[Method 3]:** [Description of the method]
-
-### Warnings and Cautionary Points
 
-*   [Warning 1: Description of the risk or cautionary point]
-*   [Warning 2: Description of the risk or cautionary point]
-*   [Warning 3: Description of the risk or cautionary point]
+    selected_template, _ = build_summary_template(detail_level, enable_text_analysis)
 
-### Tools and Products Mentioned
-
-*   **[Tool/Product 1]:** [Brief description or context of mention]
-*   **[Tool/Product 2]:** [Brief description or context of mention]
-
-### Points of Debate and Divergent Opinions
-
-*   **[Debate Topic 1]:** [Description of different viewpoints]
-*   **[Debate Topic 2]:** [Description of different viewpoints]
-"""
-
-    report_conclusion_part = """
----
-
-## Report Conclusion
-
-[Summarize here the 3 or 4 most important takeaways from the discussion. What are the final recommendations?]
-"""
-
-    sentiment_analysis_part = """
----
-
-## Sentiment Analysis
-
-*   **Overall Sentiment:** [Overall sentiment of the discussion (e.g., Positive, Negative, Neutral, Mixed)]
-*   **Key Positive Aspects:** [List 2-3 positive themes or points of view]
-*   **Key Negative Aspects:** [List 2-3 negative themes or points of view]
-"""
+    try:
+        comment_text = prepare_comment_text(
+            comments, "gemini", model_name,
+            lambda prompt, max_tokens, batch_report: _gemini_complete(prompt, model_name, max_tokens, report=batch_report),
+            report, comment_priorities
+        )
+        prompt_instruction = _final_prompt(comment_text, selected_template, submission_data, model_name, detail_level, previous_summary)
+        return _gemini_result(_gemini_complete(prompt_instruction, model_name, stream_callback=stream_callback, report=report))
+    except Exception as e:
+        return _gemini_error(e, model_name)
 
-    # Construct templates dynamically based on detail_level
-    if detail_level == "concise":
-        selected_template = base_template_part
-    elif detail_level == "standard":
-        selected_template = base_template_part + central_issue_part + report_conclusion_part
-    else: # Default to detailed
-        selected_template = base_template_part + central_issue_part + community_discussion_part + report_conclusion_part
-
-    # Add sentiment analysis part if enabled
-    if enable_text_analysis:
-        selected_template += sentiment_analysis_part
-
-    # Fill in the Key Information section of the selected template
-    if submission_data:
-        selected_template = selected_template.replace("[Thread Title]", sanitize_input(submission_data.get('title', 'N/A')))
-        selected_template = selected_template.replace("[Link to thread]", sanitize_input(submission_data.get('url', 'N/A')))
-        selected_template = selected_template.replace("[Subreddit Name]", sanitize_input(submission_data.get('subreddit', 'N/A')))
-        selected_template = selected_template.replace("[Original Post Date]", sanitize_input(submission_data.get('date', 'N/A')))
-        selected_template = selected_template.replace("[Number of Comments]", str(submission_data.get('num_comments', 'N/A')))
-        selected_template = selected_template.replace("[Google Gemini model name]", model_name)
-
-    # Instruction for the AI to fill the template
-    prompt_instruction = f"""
-Please summarize the following Reddit thread comments and fill in the provided template.
-Ensure you strictly adhere to the template structure and fill all bracketed fields `[ ]` with relevant information extracted from the comments.
-If a section has no relevant information, you can leave its bullet points or descriptions empty, but keep the section headers.
+async def summarize_with_gemini_async(comments, api_key, model_name, detail_level="standard", submission_data=None, enable_text_analysis=False,
+                                      stream_callback=None, report=None, comment_priorities=None, previous_summary=None):
+    # Async counterpart of summarize_with_gemini, using the library's generate_content_async.
+    setup_error = _gemini_setup_error(api_key)
+    if setup_error:
+        return setup_error
 
-Reddit Comments:
-{comment_text}
+    genai.configure(api_key=api_key)
 
-Template to fill:
-{selected_template}
-
-Summary:
-"""
+    selected_template, _ = build_summary_template(detail_level, enable_text_analysis)
 
     try:
-        # Ensure the model name is correctly formatted (e.g., "models/gemini-pro")
-        if not model_name.startswith("models/"):
-            model_name = f"models/{model_name}"
-            
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt_instruction) # Use the full prompt with template
-        
-        # Check for empty or invalid response
-        if not response.text or not response.text.strip():
-            return "The model returned an empty response. Please try again."
-            
-        return response.text.strip()
+        comment_text = await prepare_comment_text_async(
+            comments, "gemini", model_name,
+            lambda prompt, max_tokens, batch_report: _gemini_complete_async(prompt, model_name, max_tokens, report=batch_report),
+            report, comment_priorities
+        )
+        prompt_instruction = _final_prompt(comment_text, selected_template, submission_data, model_name, detail_level, previous_summary)
+        return _gemini_result(await _gemini_complete_async(prompt_instruction, model_name, stream_callback=stream_callback, report=report))
     except Exception as e:
-        error_message = f"Error summarizing with Google Gemini: {e}"
-        print(f"{error_message} (Model: {model_name})")
-        return "An error occurred while summarizing with Google Gemini. Please check your API key, the selected model, and try again."
+        return _gemini_error(e, model_name)
+
+def _default_model(provider, model_preferences):
+    if provider == "openai":
+        return model_preferences.get('openai_default_model', 'gpt-4.1-nano')
+    return model_preferences.get('gemini_default_model', 'gemini-2.5-flash')
+
+async def _summarize_async(provider, comments, api_keys, model_name, detail_level, submission_data, enable_text_analysis,
+                           stream_callback, report, priorities, previous_summary=None):
+    """Summarizes with the async function of the given provider ("openai" or "gemini")."""
+    if provider == "openai":
+        return await summarize_with_openai_async(comments, api_keys.get('openai_api_key'), model_name, detail_level, submission_data, enable_text_analysis,
+                                                 stream_callback, report, priorities, previous_summary)
+    return await summarize_with_gemini_async(comments, api_keys.get('google_gemini_api_key'), model_name, detail_level, submission_data, enable_text_analysis,
+                                             stream_callback, report, priorities, previous_summary)
+
+async def get_reddit_digest_async(url, summarization_method="top5", model_name=None, detail_level=None, enable_text_analysis=False, report=None,
+                                  progress_callback=None, cancel_event=None, use_summary_cache=True,
+                                  force_refresh=False, thread_cache_ttl=None, stream_callback=None, expand_comments=None,
+                                  top_k=None, ranking_strategy=None, presummarize=None, deduplicate=None, incremental=None):
+    # Async variant of the digest pipeline: Reddit is read with Async PRAW (when installed) and the
+    # models through their async clients, so one event loop can keep many digests in flight.
+    # Cache lookups and CPU-bound steps run on worker threads to keep the loop responsive.
+    # `report`, if given, is a dict filled with timings and pipeline details for the caller.
+    # `progress_callback` is called with each pipeline stage name (see DIGEST_STAGES) and
+    # `cancel_event` (e.g. a threading.Event) aborts with DigestCancelled between stages.
+    # AI summaries are served from the summary cache when `use_summary_cache` is set.
+    # Threads fetched less than `thread_cache_ttl` seconds ago are read from the thread cache
+    # unless `force_refresh` is set.
+    # `stream_callback` receives AI summary text chunks as they are generated.
+    # `expand_comments` turns expansion of collapsed replies on or off (None: use the preferences).
+    # `top_k` and `ranking_strategy` choose how many and which comments the Top 5 method lists.
+    # `presummarize` turns the local extractive prompt reduction on or off (None: use the preferences).
+    # `deduplicate` turns folding of near-duplicate comments on or off (None: use the preferences).
+    # `incremental` turns incremental digests on or off (None: use the preferences): when the history holds an
+    # AI digest of the thread with the same options, only new and edited comments are sent, with that digest to update.
+    # Digests put 'submission_id' (and AI digests 'comment_fingerprints') in `report`; pass them to add_digest_to_history.
+    if report is None:
+        report = {}
+
+    def enter_stage(stage):
+        if cancel_event is not None and cancel_event.is_set():
+            raise DigestCancelled()
+        if progress_callback:
+            progress_callback(stage)
 
-def get_reddit_digest(url, summarization_method="top5", model_name=None, detail_level=None, enable_text_analysis=False):
     # Enhanced URL validation
     is_valid, message = validate_reddit_url(url)
     if not is_valid:
         return f"Invalid Reddit URL: {message}", None, None
+    if summarization_method == "race" and model_name:
+        return f"The race method takes its models from the \"race\" preferences; it cannot use the model {model_name}.", None, None
     
     # Parse URL to extract components
     parsed_url = urlparse(url)
@@ -523,43 +1052,41 @@ def get_reddit_digest(url, summarization_method="top5", model_name=None, detail_
     
     subreddit_name = match.group(1)
     submission_id = match.group(2)
+    report['submission_id'] = submission_id # Lets the history tell which threads were digested, whatever the method
 
     api_keys = load_api_keys()
 
     try:
-        # Initialize PRAW with your Reddit API credentials
+        # Reuse a pooled PRAW client for these Reddit API credentials
         reddit_creds = api_keys.get('reddit_creds', {})
-        
-        reddit = praw.Reddit(
-            client_id=reddit_creds.get('client_id'),
-            client_secret=reddit_creds.get('client_secret'),
-            user_agent=reddit_creds.get('user_agent'),
-            username=reddit_creds.get('username'),
-            password=reddit_creds.get('password')
-        )
-        reddit.read_only = True # We are only reading data
 
-        submission = reddit.submission(id=submission_id)
-        submission.comments.replace_more(limit=0) # Flatten comments, remove "More Comments"
+        enter_stage("fetching")
+        model_preferences = load_model_preferences()
+        expansion_config = get_expansion_config(model_preferences, expand_comments)
+        snapshot = await get_thread_snapshot_async(submission_id, reddit_creds, force_refresh, thread_cache_ttl, report, expansion_config)
+        report['comments_collected'] = len(snapshot['comments'])
 
         # Prepare submission data for the template
-        submission_date = datetime.fromtimestamp(submission.created_utc).strftime('%Y-%m-%d %H:%M:%S')
+        submission_date = datetime.fromtimestamp(snapshot['created_utc']).strftime('%Y-%m-%d %H:%M:%S')
         submission_data = {
-            'title': submission.title,
+            'title': snapshot['title'],
             'url': url,
-            'subreddit': submission.subreddit.display_name,
+            'subreddit': snapshot['subreddit'],
             'date': submission_date,
-            'num_comments': submission.num_comments
+            'num_comments': snapshot['num_comments']
         }
 
-        all_comments = []
-        for top_level_comment in submission.comments:
-            if isinstance(top_level_comment, praw.models.Comment):
-                all_comments.append(sanitize_input(top_level_comment.body))
-        
-        if not all_comments:
-            return "No top-level comments found for summarization."
+        # Top-level comments feed the Top 5 digest; AI summaries also get nested replies, indented under their parent
+        top_level_comments = [comment for comment in snapshot['comments'] if comment.get('depth', 0) == 0]
+
+        if not top_level_comments:
+            return "No top-level comments found for summarization.", None, submission_data.get('title')
 
+        ranking_config = get_ranking_config(model_preferences, top_k, ranking_strategy)
+        top_comments = [sanitize_input(comment['body']) for comment in
+                        top_k_comments(top_level_comments, ranking_config['top_k'], ranking_config['strategy'])]
+
+        enter_stage("building_prompt")
         if summarization_method == "top5":
             digest = f"# Reddit Thread Summary: {sanitize_input(submission_data.get('title', 'N/A'))}\n\n"
             digest += "## Key Information\n\n"
@@ -567,42 +1094,167 @@ def get_reddit_digest(url, summarization_method="top5", model_name=None, detail_
             digest += f"*   **Subreddit:** r/{sanitize_input(submission_data.get('subreddit', 'N/A'))}\n"
             digest += f"*   **Publication Date:** {sanitize_input(submission_data.get('date', 'N/A'))}\n"
             digest += f"*   **Activity:** {submission_data.get('num_comments', 'N/A')}\n"
-            digest += "*   **Summarization Method:** Top 5 Comments (N/A)\n\n"
+            digest += f"*   **Summarization Method:** Top {ranking_config['top_k']} Comments (ranked by {ranking_config['strategy']})\n\n"
             digest += "---\n\n"
-            digest += "Top 5 Comments:\n"
-            comment_count = 0
-            for comment_body in all_comments:
-                if comment_count >= 5:
-                    break
+            digest += f"Top {ranking_config['top_k']} Comments:\n"
+            for comment_count, comment_body in enumerate(top_comments):
                 digest += f"- **Comment {comment_count+1}:** {comment_body}\n"
-                comment_count += 1
             digest += "\n"
-        elif summarization_method == "openai":
-            model_preferences = load_model_preferences()
-            actual_model_name = model_name if model_name else model_preferences.get('openai_default_model', 'gpt-4.1-nano')
-            digest = summarize_with_openai(all_comments, api_keys.get('openai_api_key'), actual_model_name, detail_level, submission_data, enable_text_analysis)
-        elif summarization_method == "gemini":
-            model_preferences = load_model_preferences()
-            actual_model_name = model_name if model_name else model_preferences.get('gemini_default_model', 'gemini-2.5-flash')
-            digest = summarize_with_gemini(all_comments, api_keys.get('google_gemini_api_key'), actual_model_name, detail_level, submission_data, enable_text_analysis)
+        elif summarization_method in AI_SUMMARIZATION_METHODS:
+            # Hashing, formatting and ranking every comment of a large thread takes a while; it runs off the event loop
+            prompt_source = snapshot['comments']
+            report['comment_fingerprints'] = await asyncio.to_thread(fingerprint_comments, snapshot['comments'])
+
+            # Incremental digest: only what changed since the last digest of this thread goes to the model
+            previous = None
+            incremental_config = get_incremental_config(model_preferences, incremental)
+            if incremental_config['enabled']:
+                previous = await asyncio.to_thread(get_latest_digest_state, submission_id, AI_SUMMARIZATION_METHODS, detail_level, enable_text_analysis)
+            if previous is not None:
+                changed_comments, report['incremental'] = await asyncio.to_thread(select_changed_comments, snapshot['comments'],
+                                                                                  previous['comment_fingerprints'], incremental_config)
+                if not changed_comments:
+                    report['incremental']['mode'] = "unchanged"
+                    return previous['digest_content'], previous['model'], submission_data.get('title')
+                if len(changed_comments) > incremental_config['max_changed_fraction'] * len(snapshot['comments']):
+                    report['incremental']['mode'] = "full"
+                    previous = None
+                else:
+                    report['incremental']['mode'] = "delta"
+                    prompt_source = changed_comments
+            previous_summary = previous['digest_content'] if previous is not None else None
+
+            # Fold "+1"s and copy-pasted comments into one representative carrying their count
+            dedup_config = get_dedup_config(model_preferences, deduplicate)
+            if dedup_config['enabled']:
+                prompt_source, report['deduplication'] = await asyncio.to_thread(fold_near_duplicates, prompt_source, dedup_config)
+
+            # Optionally keep only the most central sentences to shrink the prompt
+            presummary_config = get_presummary_config(model_preferences, presummarize)
+            if presummary_config['enabled']:
+                reduced_bodies, report['presummary'] = await asyncio.to_thread(presummarize_comments, [comment['body'] for comment in prompt_source], presummary_config['target_tokens'])
+                prompt_source = [dict(comment, body=body) for comment, body in zip(prompt_source, reduced_bodies) if body]
+            prompt_comments = await asyncio.to_thread(_format_prompt_comments, prompt_source)
+
+            if summarization_method == "race":
+                race_config = get_race_config(model_preferences)
+                racers = [(entry['provider'], entry.get('model') or _default_model(entry['provider'], model_preferences))
+                          for entry in (race_config['primary'], race_config['secondary'])]
+            else:
+                racers = [(summarization_method, model_name if model_name else _default_model(summarization_method, model_preferences))]
+            actual_model_name = racers[0][1] # Until a race has a winner: the primary model
+
+            # Identical thread snapshot and parameters: reuse the previous summary. Updates are keyed by the digest they update.
+            # Summaries are keyed by the provider and model that wrote them, so a race reuses either racer's summary.
+            cache_keys = {}
+            for provider, model in racers:
+                cache_method = f"{provider}+update:{previous['id']}" if previous is not None else provider
+                cache_keys[(provider, model)] = await asyncio.to_thread(make_summary_cache_key, submission_id, prompt_comments, cache_method, model,
+                                                                        detail_level, enable_text_analysis)
+            digest = None
+            if use_summary_cache:
+                for (provider, model), cache_key in cache_keys.items():
+                    digest = await asyncio.to_thread(get_cached_summary, cache_key)
+                    if digest is not None:
+                        actual_model_name = model
+                        break
+            report['summary_cache'] = "hit" if digest is not None else ("miss" if use_summary_cache else "disabled")
+
+            if digest is None:
+                enter_stage("summarizing")
+                # The same ranking decides which comments stay in the prompt when the token budget is tight
+                priorities = await asyncio.to_thread(comment_priorities, prompt_source, ranking_config['strategy'])
+                summarized_by = racers[0]
+                if summarization_method == "race":
+                    # Each racer reports into its own dict; the winner's details are kept
+                    racer_reports = {f"{provider}:{model}": {} for provider, model in racers}
+                    def racer(provider, model):
+                        return lambda: _summarize_async(provider, prompt_comments, api_keys, model, detail_level, submission_data, enable_text_analysis,
+                                                        None, racer_reports[f"{provider}:{model}"], priorities, previous_summary)
+                    digest, outcome = await race((f"{racers[0][0]}:{racers[0][1]}", racer(*racers[0])),
+                                                 (f"{racers[1][0]}:{racers[1][1]}", racer(*racers[1])),
+                                                 race_config['hedge_delay_seconds'], is_error_digest)
+                    await asyncio.to_thread(record_race, outcome)
+                    report['race'] = outcome
+                    if outcome['winner']:
+                        report.update(racer_reports[outcome['winner']])
+                        summarized_by = tuple(outcome['winner'].split(":", 1))
+                        actual_model_name = summarized_by[1]
+                else:
+                    digest = await _summarize_async(summarization_method, prompt_comments, api_keys, actual_model_name, detail_level, submission_data,
+                                                    enable_text_analysis, stream_callback, report, priorities, previous_summary)
+                if use_summary_cache and not is_error_digest(digest):
+                    await asyncio.to_thread(put_cached_summary, cache_keys[summarized_by], submission_id, digest)
+        elif summarization_method == "extractive":
+            # Fully offline: key sentences, terms and representative comments are computed locally
+            enter_stage("summarizing")
+            digest = await asyncio.to_thread(summarize_extractive, [sanitize_input(comment['body']) for comment in snapshot['comments']], detail_level,
+                                             submission_data, enable_text_analysis, sanitize_input(snapshot['selftext']))
         else: # Default to top5 if method is unrecognized
-            digest = f"# Reddit Digest: {sanitize_input(submission.title)}\n\n"
-            if submission.selftext:
-                digest += f"## Post Content:\n{sanitize_input(submission.selftext)}\n\n"
-            elif submission.url and not submission.is_self:
-                digest += f"## Post Link:\n{sanitize_input(submission.url)}\n\n"
+            digest = f"# Reddit Digest: {sanitize_input(snapshot['title'])}\n\n"
+            if snapshot['selftext']:
+                digest += f"## Post Content:\n{sanitize_input(snapshot['selftext'])}\n\n"
+            elif snapshot['link_url'] and not snapshot['is_self']:
+                digest += f"## Post Link:\n{sanitize_input(snapshot['link_url'])}\n\n"
             
-            digest += "## Top 5 Comments (Default):\n\n"
-            comment_count = 0
-            for comment_body in all_comments:
-                if comment_count >= 5:
-                    break
+            digest += f"## Top {ranking_config['top_k']} Comments (Default):\n\n"
+            for comment_count, comment_body in enumerate(top_comments):
                 digest += f"- **Comment {comment_count+1}:** {comment_body}\n"
-                comment_count += 1
             digest += "\n"
 
+    except DigestCancelled:
+        raise
     except Exception as e:
         print(f"Error fetching Reddit content or summarizing: {e}")
         return "An unexpected error occurred while fetching Reddit content or summarizing. Please check the URL, your internet connection, and your API credentials.", None, None
 
-    return digest, actual_model_name if summarization_method in ["openai", "gemini"] else None, submission.title
+    return digest, actual_model_name if summarization_method in AI_SUMMARIZATION_METHODS else None, snapshot['title']
+
+# Event loop shared by synchronous callers; started on first use and kept for the process lifetime
+_digest_loop = None
+_digest_loop_lock = threading.Lock()
+
+def _get_digest_loop():
+    global _digest_loop
+    with _digest_loop_lock:
+        if _digest_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="digest-event-loop", daemon=True).start()
+            _digest_loop = loop
+    return _digest_loop
+
+def submit_digest_coroutine(coroutine):
+    """Schedules a coroutine on the shared digest event loop and returns its concurrent.futures.Future.
+
+    Cancelling the future cancels the coroutine, even in the middle of a network request.
+    """
+    loop = _get_digest_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        coroutine.close()
+        raise RuntimeError("Waiting for a digest on the digest event loop would deadlock; await the coroutine instead.")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+def run_digest_coroutine(coroutine):
+    """Runs a coroutine on the shared digest event loop and blocks the calling thread until it completes.
+
+    Digests submitted from many threads at once share the loop (and its pooled async clients)
+    instead of each holding a thread for the whole network round trip.
+    """
+    return submit_digest_coroutine(coroutine).result()
+
+def get_reddit_digest(url, summarization_method="top5", model_name=None, detail_level=None, enable_text_analysis=False, report=None,
+                      progress_callback=None, cancel_event=None, use_summary_cache=True,
+                      force_refresh=False, thread_cache_ttl=None, stream_callback=None, expand_comments=None,
+                      top_k=None, ranking_strategy=None, presummarize=None, deduplicate=None, incremental=None):
+    # Synchronous wrapper over get_reddit_digest_async, which documents the parameters.
+    # Callbacks are invoked from the digest event loop thread.
+    return run_digest_coroutine(get_reddit_digest_async(
+        url, summarization_method, model_name, detail_level, enable_text_analysis, report,
+        progress_callback, cancel_event, use_summary_cache,
+        force_refresh, thread_cache_ttl, stream_callback, expand_comments,
+        top_k, ranking_strategy, presummarize, deduplicate, incremental
+    ))
@@ -6,14 +6,18 @@ from PyQt6.QtWidgets import (
     QLineEdit, QPushButton, QTextEdit, QLabel, QMessageBox,
     QComboBox, QStackedWidget
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, pyqtSignal
 
 from reddit_digest import get_reddit_digest as get_digest_from_backend
-from reddit_digest import get_available_openai_models, get_available_gemini_models
+from reddit_digest import get_cached_openai_models, get_cached_gemini_models, load_model_preferences
 
 class RedditDigestApp(QWidget):
+    # Emitted from the model catalog's refresh thread; Qt delivers it on the GUI thread
+    models_refreshed = pyqtSignal(str, list)
+
     def __init__(self):
         super().__init__()
+        self.models_refreshed.connect(self.on_models_refreshed)
         self.setWindowTitle("Reddigest - Reddit Threads Summarizer")
         self.setGeometry(100, 100, 800, 600)
         self.init_ui()
@@ -43,6 +47,7 @@ class RedditDigestApp(QWidget):
         self.method_selector.addItem("Top 5 Comments", "top5")
         self.method_selector.addItem("OpenAI Summary", "openai")
         self.method_selector.addItem("Gemini Summary", "gemini")
+        self.method_selector.addItem("Extractive Summary (Offline)", "extractive")
         self.method_selector.currentIndexChanged.connect(self.update_model_selection_visibility)
         input_grid_layout.addWidget(self.method_label, 2, 0)
         input_grid_layout.addWidget(self.method_selector, 2, 1)
@@ -54,13 +59,9 @@ class RedditDigestApp(QWidget):
         self.gemini_model_selector = QComboBox()
         self.gemini_model_selector.setMaximumHeight(30) # Limit height to prevent excessive vertical expansion
 
-        # Populate OpenAI models
-        for model in get_available_openai_models():
-            self.openai_model_selector.addItem(model)
-        
-        # Populate Gemini models
-        for model in get_available_gemini_models():
-            self.gemini_model_selector.addItem(model)
+        # Populate OpenAI and Gemini models from the local catalog; stale lists are refreshed in the background
+        self.openai_model_selector.addItems(get_cached_openai_models(self.models_refreshed.emit))
+        self.gemini_model_selector.addItems(get_cached_gemini_models(self.models_refreshed.emit))
 
         self.model_stacked_widget = QStackedWidget()
         self.empty_model_widget = QWidget() # Create a single instance for the empty widget
@@ -70,6 +71,11 @@ class RedditDigestApp(QWidget):
         input_grid_layout.addWidget(self.model_label, 2, 2)
         input_grid_layout.addWidget(self.model_stacked_widget, 2, 3)
 
+        # Row 3: Explicit refresh of the model lists
+        self.refresh_models_button = QPushButton("Refresh Models")
+        self.refresh_models_button.clicked.connect(self.refresh_models)
+        input_grid_layout.addWidget(self.refresh_models_button, 3, 3)
+
         self.update_model_selection_visibility(self.method_selector.currentIndex()) # Set initial visibility
 
         # Digest display area
@@ -94,6 +100,20 @@ class RedditDigestApp(QWidget):
             self.model_stacked_widget.setCurrentWidget(self.empty_model_widget) # Use the single instance
             self.model_label.setVisible(False)
 
+    def refresh_models(self):
+        get_cached_openai_models(self.models_refreshed.emit, force_refresh=True)
+        get_cached_gemini_models(self.models_refreshed.emit, force_refresh=True)
+
+    def on_models_refreshed(self, provider, models):
+        selector = self.openai_model_selector if provider == "openai" else self.gemini_model_selector
+        # Prefer the saved default model when the earlier list could not show it
+        saved_model = load_model_preferences().get(f"{provider}_default_model")
+        selected_model = saved_model if saved_model and selector.findText(saved_model) < 0 else selector.currentText()
+        selector.clear()
+        selector.addItems(models)
+        if selected_model in models:
+            selector.setCurrentText(selected_model)
+
     def generate_digest(self):
         url = self.url_input.text()
         if not url:
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# Persistent cache of AI summaries, so re-digesting an unchanged thread skips the LLM call
+SUMMARY_CACHE_FILE = 'summary_cache.db'
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60 # One week
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _connect():
+    conn = sqlite3.connect(SUMMARY_CACHE_FILE, timeout=10)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS summaries (
+            cache_key TEXT PRIMARY KEY,
+            submission_id TEXT NOT NULL,
+            digest_content TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_used ON summaries (last_used_at)")
+    return conn
+
+def _count(stat, amount=1):
+    with _stats_lock:
+        _stats[stat] += amount
+
+def hash_comment_snapshot(comments):
+    """Returns a SHA-256 hex digest of the comment texts, in order."""
+    hasher = hashlib.sha256()
+    for comment in comments:
+        hasher.update(comment.encode('utf-8'))
+        hasher.update(b'\x1e') # Record separator, so ["ab"] and ["a", "b"] differ
+    return hasher.hexdigest()
+
+def make_summary_cache_key(submission_id, comments, method, model, detail_level, enable_text_analysis):
+    """Builds a content-addressed key from the thread snapshot and the summarization parameters."""
+    key_material = json.dumps([submission_id, hash_comment_snapshot(comments), method, model, detail_level, bool(enable_text_analysis)])
+    return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+def get_cached_summary(cache_key, ttl_seconds=DEFAULT_TTL_SECONDS):
+    """Returns the cached digest for a key, or None on a miss or an expired entry."""
+    now = time.time()
+    try:
+        with _connect() as conn:
+            row = conn.execute("SELECT digest_content, created_at FROM summaries WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row and now - row[1] <= ttl_seconds:
+                conn.execute("UPDATE summaries SET last_used_at = ? WHERE cache_key = ?", (now, cache_key))
+                _count("hits")
+                return row[0]
+            if row: # Expired
+                conn.execute("DELETE FROM summaries WHERE cache_key = ?", (cache_key,))
+                _count("evictions")
+    except sqlite3.Error as e:
+        print(f"Error reading summary cache {SUMMARY_CACHE_FILE}: {e}")
+    _count("misses")
+    return None
+
+def put_cached_summary(cache_key, submission_id, digest_content, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+    """Stores a digest, then evicts expired entries and the least recently used ones above max_entries."""
+    now = time.time()
+    try:
+        with _connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (cache_key, submission_id, digest_content, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                (cache_key, submission_id, digest_content, now, now)
+            )
+            evicted = conn.execute("DELETE FROM summaries WHERE created_at < ?", (now - ttl_seconds,)).rowcount
+            evicted += conn.execute("""
+                DELETE FROM summaries WHERE cache_key IN (
+                    SELECT cache_key FROM summaries ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (max_entries,)).rowcount
+            if evicted:
+                _count("evictions", evicted)
+    except sqlite3.Error as e:
+        print(f"Error writing summary cache {SUMMARY_CACHE_FILE}: {e}")
+
+def get_summary_cache_stats():
+    """Returns hit/miss/eviction counters for this process and the current number of entries."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+    try:
+        with _connect() as conn:
+            stats["entries"] = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+    except sqlite3.Error:
+        stats["entries"] = None
+    return stats
+
+def clear_summary_cache():
+    """Removes every cached summary."""
+    try:
+        with _connect() as conn:
+            conn.execute("DELETE FROM summaries")
+    except sqlite3.Error as e:
+        print(f"Error clearing summary cache {SUMMARY_CACHE_FILE}: {e}")
@@ -0,0 +1,103 @@
+# The Markdown report filled by every summarization method except Top 5
+
+# Parts of the summary template, combined according to the detail level
+BASE_TEMPLATE_PART = """
+# Reddit Thread Summary: [Thread Title]
+
+## Key Information
+
+*   **Source:** [Link to thread]
+*   **Subreddit:** r/[Subreddit Name]
+*   **Publication Date:** [Original Post Date]
+*   **Activity:** [Number of Comments]
+*   **Summarization Method:** [Model name] ([Detail Level])
+
+---
+
+## Summary
+
+[Write a 2-4 sentence paragraph here summarizing the main issue and the general conclusion of the discussion thread. What is the main takeaway?]
+"""
+
+CENTRAL_ISSUE_PART = """
+---
+
+## Central Issue
+
+[Clearly describe the problem, question, or initial topic raised by the Original Poster (OP).]
+"""
+
+COMMUNITY_DISCUSSION_PART = """
+---
+
+## Community Discussion Analysis
+
+### General Consensus and Best Practices
+
+*   [Consensus Point 1]
+*   [Consensus Point 2]
+*   [Consensus Point 3]
+
+### Suggested Solutions and Methods
+
+*   **[Method 1]:** [Description of the method]
+*   **[Method 2]:** [Description of the method]
+*   **[Method 3]:** [Description of the method]
+
+### Warnings and Cautionary Points
+
+*   [Warning 1: Description of the risk or cautionary point]
+*   [Warning 2: Description of the risk or cautionary point]
+*   [Warning 3: Description of the risk or cautionary point]
+
+### Tools and Products Mentioned
+
+*   **[Tool/Product 1]:** [Brief description or context of mention]
+*   **[Tool/Product 2]:** [Brief description or context of mention]
+
+### Points of Debate and Divergent Opinions
+
+*   **[Debate Topic 1]:** [Description of different viewpoints]
+*   **[Debate Topic 2]:** [Description of different viewpoints]
+"""
+
+REPORT_CONCLUSION_PART = """
+---
+
+## Report Conclusion
+
+[Summarize here the 3 or 4 most important takeaways from the discussion. What are the final recommendations?]
+"""
+
+SENTIMENT_ANALYSIS_PART = """
+---
+
+## Sentiment Analysis
+
+*   **Overall Sentiment:** [Overall sentiment of the discussion (e.g., Positive, Negative, Neutral, Mixed)]
+*   **Key Positive Aspects:** [List 2-3 positive themes or points of view]
+*   **Key Negative Aspects:** [List 2-3 negative themes or points of view]
+"""
+
+def build_summary_template(detail_level, enable_text_analysis):
+    """Assembles the Markdown template for a detail level and returns it with its max output tokens.
+
+    The template only depends on its arguments, so it can lead every prompt of that kind as a
+    stable prefix that providers cache; thread details go in reddit_digest.build_thread_details.
+    """
+    # Construct templates dynamically based on detail_level
+    if detail_level == "concise":
+        selected_template = BASE_TEMPLATE_PART
+        max_tokens_val = 500 # Adjusted for concise summary
+    elif detail_level == "standard":
+        selected_template = BASE_TEMPLATE_PART + CENTRAL_ISSUE_PART + REPORT_CONCLUSION_PART
+        max_tokens_val = 1000 # Adjusted for standard summary
+    else: # Default to detailed
+        selected_template = BASE_TEMPLATE_PART + CENTRAL_ISSUE_PART + COMMUNITY_DISCUSSION_PART + REPORT_CONCLUSION_PART
+        max_tokens_val = 2000 # Adjusted for detailed summary
+
+    # Add sentiment analysis part if enabled
+    if enable_text_analysis:
+        selected_template += SENTIMENT_ANALYSIS_PART
+
+    return selected_template, max_tokens_val
@@ -0,0 +1,75 @@
+import http.client
+import threading
+import time
+
+from digest_server import DigestService, create_server, get_server_config
+
+CALLERS = 5
+
+def make_service(digest_function, saves):
+    def save(*args):
+        saves.append(args)
+        return len(saves)
+    return DigestService(get_server_config(), digest_function, lambda digest: False, save)
+
+def run_concurrently(service, arguments_list):
+    responses = [None] * len(arguments_list)
+    def call(index):
+        responses[index] = service.digest(arguments_list[index])
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(len(arguments_list))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return responses
+
+def test_concurrent_identical_requests_run_and_save_once():
+    runs = []
+    saves = []
+    service = None
+
+    def digest_function(url, method, model, detail_level, enable_text_analysis, report=None, **kwargs):
+        runs.append(url)
+        # Hold the run until every caller has joined it
+        deadline = time.monotonic() + 5
+        while service.metrics["requests"] < CALLERS and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        report["submission_id"] = "abc123"
+        report["comment_fingerprints"] = {"c1": "0123456789ab"}
+        return "digest", "model", "title"
+
+    service = make_service(digest_function, saves)
+    arguments = DigestService.parse_request({"url": "https://www.reddit.com/r/python/comments/abc123/", "method": "extractive"})
+    responses = run_concurrently(service, [dict(arguments, save_history=index % 2 == 0) for index in range(CALLERS)])
+
+    assert len(runs) == 1
+    assert len(saves) == 1
+    assert saves[0][-2:] == ("abc123", {"c1": "0123456789ab"})
+    assert sorted(response["coalesced"] for response in responses) == [False] + [True] * (CALLERS - 1)
+    assert all(response["history_id"] == 1 for response in responses)
+    assert all("comment_fingerprints" not in response["report"] for response in responses)
+
+def test_requests_without_save_history_are_not_saved():
+    saves = []
+    service = make_service(lambda *args, report=None, **kwargs: ("digest", "model", "title"), saves)
+    response = service.digest(DigestService.parse_request({"url": "https://www.reddit.com/r/python/comments/abc123/"}))
+    assert response["status"] == "ok"
+    assert "history_id" not in response
+    assert saves == []
+
+def test_invalid_content_length_is_rejected():
+    server = create_server(get_server_config(None, {"port": 0}), lambda *args, report=None, **kwargs: ("digest", None, "title"),
+                           lambda digest: False, lambda *args: None)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for content_length in ("abc", "-1"):
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+            connection.putrequest("POST", "/digest")
+            connection.putheader("Content-Length", content_length)
+            connection.endheaders()
+            assert connection.getresponse().status == 400
+            connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
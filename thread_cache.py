@@ -0,0 +1,63 @@
+import json
+import sqlite3
+import time
+
+# Local snapshots of fetched threads (submission metadata and flattened comments), keyed by post id
+THREAD_CACHE_FILE = 'thread_cache.db'
+DEFAULT_TTL_SECONDS = 10 * 60 # Snapshots younger than this are served without a network fetch
+DEFAULT_MAX_ENTRIES = 200 # Snapshots of expanded threads can run to megabytes each
+DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60 # Older snapshots are deleted, whatever TTL callers ask for
+
+def _connect():
+    conn = sqlite3.connect(THREAD_CACHE_FILE, timeout=10)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS threads (
+            post_id TEXT PRIMARY KEY,
+            snapshot TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_threads_fetched_at ON threads (fetched_at)")
+    return conn
+
+def load_thread_snapshot(post_id, ttl_seconds=DEFAULT_TTL_SECONDS):
+    """Returns the cached snapshot for a post if it is fresher than ttl_seconds, otherwise None."""
+    try:
+        with _connect() as conn:
+            row = conn.execute("SELECT snapshot, fetched_at FROM threads WHERE post_id = ?", (post_id,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"Error reading thread cache {THREAD_CACHE_FILE}: {e}")
+        return None
+    if not row or time.time() - row[1] > ttl_seconds:
+        return None
+    try:
+        return json.loads(row[0])
+    except json.JSONDecodeError:
+        print(f"Warning: Could not decode cached thread {post_id}. Ignoring it.")
+        return None
+
+def save_thread_snapshot(post_id, snapshot, max_entries=DEFAULT_MAX_ENTRIES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+    """Stores (or replaces) the snapshot of a post, then deletes snapshots older than max_age_seconds and the oldest ones above max_entries."""
+    now = time.time()
+    try:
+        with _connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO threads (post_id, snapshot, fetched_at) VALUES (?, ?, ?)",
+                (post_id, json.dumps(snapshot, ensure_ascii=False), now)
+            )
+            conn.execute("DELETE FROM threads WHERE fetched_at < ?", (now - max_age_seconds,))
+            conn.execute("""
+                DELETE FROM threads WHERE post_id IN (
+                    SELECT post_id FROM threads ORDER BY fetched_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (max_entries,))
+    except sqlite3.Error as e:
+        print(f"Error writing thread cache {THREAD_CACHE_FILE}: {e}")
+
+def clear_thread_cache():
+    """Removes every cached thread snapshot."""
+    try:
+        with _connect() as conn:
+            conn.execute("DELETE FROM threads")
+    except sqlite3.Error as e:
+        print(f"Error clearing thread cache {THREAD_CACHE_FILE}: {e}")
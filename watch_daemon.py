@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from app_config import load_model_preferences, load_api_keys
+from reddit_digest import fetch_subreddit_listing, SUBREDDIT_LISTINGS
+from digest_history import get_digested_submission_ids
+from batch_digest import run_batch_digest
+from rate_limiter import get_rate_limit_stats
+
+# Override these under "watch" in model_preferences.json, e.g.
+# "watch": {"subreddits": [{"name": "python", "listing": "top", "time_filter": "day"}], "method": "openai"}
+WATCH_DEFAULTS = {
+    "subreddits": [], # Each entry: {"name", "listing" (hot/new/rising/top/controversial), "time_filter", "limit"}
+    "listing": "hot", # Defaults for subreddit entries that leave them out
+    "time_filter": "day", # hour, day, week, month, year or all; only used by top and controversial
+    "limit": 25, # Submissions read per listing and cycle
+    "interval_seconds": 3600, # Time between the starts of two watch cycles
+    "method": "extractive", # Summarization method; extractive needs no API key
+    "model": None, # None: the method's default model
+    "detail_level": "standard",
+    "enable_text_analysis": False,
+    "workers": 4, # Threads digested at once
+    "min_comments": 5, # Threads with fewer comments are left for a later cycle
+    "redigest_new_comments": 0, # Re-digest a thread once it has this many more comments (0: never); uses incremental digests
+    "max_failures": 3, # Threads whose digest failed this often are not tried again
+    "forget_after_days": 14 # Threads missing from the listings this long are dropped from the watch state
+}
+
+WATCH_STATE_FILE = 'watch_state.json' # Persistent cursor: which threads were digested, and when
+
+def get_watch_config(preferences=None, overrides=None):
+    """Merges the defaults with preference overrides and explicit (e.g. command-line) overrides."""
+    config = dict(WATCH_DEFAULTS)
+    config.update((preferences or {}).get("watch", {}))
+    config.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    return config
+
+def parse_subreddit_spec(spec):
+    """Parses "name[:listing[:time_filter]]", e.g. "python:top:week", into a subreddit entry."""
+    parts = spec.split(":")
+    entry = {"name": parts[0].strip().removeprefix("r/")}
+    if len(parts) > 1 and parts[1]:
+        entry["listing"] = parts[1]
+    if len(parts) > 2 and parts[2]:
+        entry["time_filter"] = parts[2]
+    return entry
+
+def load_watch_state(state_file=None):
+    state_file = state_file or WATCH_STATE_FILE
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            state.setdefault("threads", {})
+            state.setdefault("listings", {})
+            return state
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Warning: Could not read watch state from {state_file}: {e}. Starting from scratch.")
+    return {"threads": {}, "listings": {}}
+
+def save_watch_state(state, state_file=None):
+    state_file = state_file or WATCH_STATE_FILE
+    temp_file = state_file + '.tmp'
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=4)
+        os.replace(temp_file, state_file) # A crash never leaves a half-written cursor
+    except IOError as e:
+        print(f"Error saving watch state to {state_file}: {e}")
+
+def _forget_old_threads(state, config):
+    cutoff = time.time() - config["forget_after_days"] * 24 * 60 * 60
+    for post_id in [post_id for post_id, thread in state["threads"].items() if thread.get("seen_at", 0) < cutoff]:
+        del state["threads"][post_id]
+
+def _needs_digest(post, thread, config):
+    if post["num_comments"] < config["min_comments"]:
+        return False
+    if thread is None:
+        return True
+    if thread.get("failures", 0) >= config["max_failures"]:
+        return False
+    if not thread.get("digested_at"):
+        return True # Seen before but not digested yet, or the digest failed
+    return config["redigest_new_comments"] > 0 and post["num_comments"] - thread.get("num_comments", 0) >= config["redigest_new_comments"]
+
+def select_new_threads(posts, state, config):
+    """Returns the posts that need a digest: new threads, failed ones and, if enabled, ones that kept growing.
+
+    Threads digested by any other means (the GUI, batch runs) are skipped too, as far as the history knows them.
+    """
+    unique_posts = list({post["id"]: post for post in posts}.values()) # A thread can appear in several listings
+    undigested_ids = [post["id"] for post in unique_posts if not state["threads"].get(post["id"], {}).get("digested_at")]
+    digested_elsewhere = get_digested_submission_ids(undigested_ids)
+    selected = []
+    for post in unique_posts:
+        thread = state["threads"].get(post["id"])
+        if post["id"] in digested_elsewhere:
+            state["threads"][post["id"]] = dict(thread or {}, seen_at=time.time(), digested_at=time.time(), num_comments=post["num_comments"])
+            continue
+        if _needs_digest(post, thread, config):
+            selected.append(post)
+    return selected
+
+def run_watch_cycle(config, state, state_file=None, stop_event=None):
+    """Reads every watched listing once and digests the threads that need it; returns the cycle's counts."""
+    reddit_creds = load_api_keys().get('reddit_creds', {})
+    stats = {"listings": 0, "posts": 0, "digested": 0, "failed": 0}
+    posts = []
+    for entry in config["subreddits"]:
+        if stop_event is not None and stop_event.is_set():
+            return stats
+        name = entry["name"]
+        listing = entry.get("listing", config["listing"])
+        time_filter = entry.get("time_filter", config["time_filter"])
+        try:
+            listing_posts = fetch_subreddit_listing(name, reddit_creds, listing, time_filter, entry.get("limit", config["limit"]))
+        except Exception as e:
+            print(f"Error reading r/{name} ({listing}): {e}")
+            continue
+        stats["listings"] += 1
+        posts.extend(listing_posts)
+        state["listings"][f"{name}:{listing}:{time_filter}"] = {"read_at": time.time(), "posts": len(listing_posts)}
+
+    stats["posts"] = len(posts)
+    selected = select_new_threads(posts, state, config)
+    now = time.time()
+    for post in posts:
+        state["threads"].setdefault(post["id"], {})["seen_at"] = now
+    _forget_old_threads(state, config)
+    save_watch_state(state, state_file)
+    if not selected:
+        return stats
+
+    posts_by_url = {post["url"]: post for post in selected}
+
+    def on_result(result):
+        # Runs on the calling thread after the history write, so the cursor only advances past saved digests
+        post = posts_by_url[result["url"]]
+        thread = state["threads"].setdefault(post["id"], {"seen_at": now})
+        if result["status"] == "ok":
+            thread.update(digested_at=time.time(), num_comments=post["num_comments"], failures=0)
+            stats["digested"] += 1
+        else:
+            thread["failures"] = thread.get("failures", 0) + 1
+            stats["failed"] += 1
+        print(f"[{result['status']}] r/{post['subreddit']} {post['title'][:80]} ({result['seconds']:.1f}s)")
+        save_watch_state(state, state_file)
+
+    # Growing threads are updated with only their new comments (see incremental.py)
+    run_batch_digest(list(posts_by_url), config["method"], config["model"], config["detail_level"], config["enable_text_analysis"],
+                     config["workers"], save_to_history=True, on_result=on_result,
+                     incremental=True if config["redigest_new_comments"] > 0 else None)
+    return stats
+
+def run_watch(config, state_file=None, once=False, stop_event=None):
+    """Runs watch cycles every interval_seconds until `stop_event` is set (or after one cycle with `once`)."""
+    stop_event = stop_event or threading.Event()
+    state = load_watch_state(state_file)
+    while not stop_event.is_set():
+        started = time.monotonic()
+        print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} Watching {len(config['subreddits'])} subreddit listings...")
+        stats = run_watch_cycle(config, state, state_file, stop_event)
+        print(f"Cycle done in {time.monotonic() - started:.1f}s: {stats['posts']} posts from {stats['listings']} listings, "
+              f"{stats['digested']} digested, {stats['failed']} failed")
+        for provider, limiter_stats in get_rate_limit_stats().items():
+            if limiter_stats["throttled"] or limiter_stats["retries"]:
+                print(f"  {provider}: throttled {limiter_stats['throttled']} times for {limiter_stats['throttle_seconds']:.1f}s, "
+                      f"{limiter_stats['retries']} retries")
+        if once:
+            break
+        stop_event.wait(max(0.0, config["interval_seconds"] - (time.monotonic() - started)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch subreddits and digest their new threads on a schedule.")
+    parser.add_argument("-s", "--subreddit", action="append", metavar="NAME[:LISTING[:TIME]]",
+                        help=f"Subreddit to watch, e.g. python:top:week (listings: {', '.join(SUBREDDIT_LISTINGS)}); "
+                             "replaces the subreddits of the preferences")
+    parser.add_argument("-m", "--method", choices=["top5", "openai", "gemini", "extractive", "race"], help="Summarization method")
+    parser.add_argument("--model", help="Model name (defaults to the model preferences)")
+    parser.add_argument("-d", "--detail-level", choices=["concise", "standard", "detailed"], help="Detail level for summaries")
+    parser.add_argument("-i", "--interval", type=float, dest="interval_seconds", help="Seconds between watch cycles")
+    parser.add_argument("-w", "--workers", type=int, help="Maximum number of threads digested at once")
+    parser.add_argument("--state-file", default=WATCH_STATE_FILE, help=f"Watch state file (default: {WATCH_STATE_FILE})")
+    parser.add_argument("--once", action="store_true", help="Run a single watch cycle and exit")
+    args = parser.parse_args(argv)
+
+    overrides = {"method": args.method, "model": args.model, "detail_level": args.detail_level,
+                 "interval_seconds": args.interval_seconds, "workers": args.workers}
+    if args.subreddit:
+        overrides["subreddits"] = [parse_subreddit_spec(spec) for spec in args.subreddit]
+    config = get_watch_config(load_model_preferences(), overrides)
+    config["subreddits"] = [parse_subreddit_spec(entry) if isinstance(entry, str) else entry for entry in config["subreddits"]]
+    if not config["subreddits"]:
+        parser.error("no subreddits to watch: use --subreddit or add them under \"watch\" in model_preferences.json")
+    if config["method"] == "race" and config["model"]:
+        parser.error("a model cannot be set for the race method, which takes its models from the \"race\" preferences")
+
+    # Finish the digests in flight and save the cursor on Ctrl+C or SIGTERM
+    stop_event = threading.Event()
+    def request_stop(signum, frame):
+        print("Stopping after the current cycle...")
+        stop_event.set()
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    run_watch(config, args.state_file, args.once, stop_event)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())